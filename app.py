@@ -1,18 +1,214 @@
-from flask import Flask, render_template, request
+import json
+import threading
+from collections import OrderedDict
+from flask import Flask, Response, render_template, request, jsonify, abort
 from datetime import datetime
-from nflsim import sim_season
+from nflsim import sim_season, iter_season, load_win_matrix, SeasonCache
+from jobs import JobQueue, QueueFull
+from scenarios import WhatIf
+import nflsim
 
 app = Flask(__name__)
+# parsed league, schedule and baseline standings per (year, start_week),
+# shared by every request thread
+season_cache = SeasonCache()
+# simulations submitted through /jobs run here instead of on request threads
+jobs = JobQueue()
+# stored runs answering what-if queries, the most recent few by (year, start_week)
+what_ifs = OrderedDict()
+what_ifs_lock = threading.Lock()
+max_what_ifs = 4
+# the job building each season's stored run, so there is one build at a time per
+# season, and likewise the job resimulating each (season, pins) too few stored epochs fit
+what_if_jobs = {}
 
 @app.route('/', methods=['GET', 'POST'])
 def home():
     if request.method == 'POST':
-        year = int(request.form['year'])
-        start_week = datetime.strptime(request.form['start_week'], "%Y-%m-%d")
-        epochs = int(request.form['epochs'])
-        results = sim_season(year, start_week, epochs)
-        return render_template('index.html', results=results.table_repr())
+        year, start_week, epochs, target_se = read_form()
+        season = season_cache.get(year, start_week)
+        results = sim_season(year, start_week, epochs, target_se=target_se, season=season)
+        return render_template('index.html', results=results.table_repr(), epochs_used=results.epochs)
     return render_template('index.html')
 
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # queues a simulation of the form's season and returns its id at once
+    year, start_week, epochs, target_se = read_form()
+    def run(job):
+        season = season_cache.get(year, start_week)
+        for results in iter_season(year, start_week, epochs, interval=0.5, target_se=target_se, season=season):
+            job.update(results.epochs, epochs, results.table_repr())
+            if job.cancelled.is_set():
+                break
+    try:
+        job = jobs.submit(run)
+    except QueueFull as e:
+        abort(503, str(e))
+    return jsonify({"job_id": job.id}), 202
+
+@app.route('/jobs/<job_id>', methods=['GET', 'DELETE'])
+def job_status(job_id):
+    # DELETE cancels the job, it stops after its current chunk of epochs
+    job = find_job(job_id)
+    if request.method == 'DELETE':
+        job.cancel()
+    return jsonify(job.state())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    # server-sent events: the job's state on every update until it finishes
+    job = find_job(job_id)
+    def stream():
+        version = None
+        while True:
+            state = job.wait(version, timeout=15)
+            if state["version"] == version:
+                # keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                continue
+            version = state["version"]
+            yield "data: " + json.dumps(state) + "\n\n"
+            if state["status"] in ("done", "failed", "cancelled"):
+                return
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def find_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        abort(404, "unknown job")
+    return job
+
+def read_form():
+    year = int(request.form['year'])
+    start_week = datetime.strptime(request.form['start_week'], "%Y-%m-%d")
+    epochs = int(request.form['epochs'])
+    # with a target standard error, epochs is the most the run may use
+    target_se = request.form.get('target_se')
+    target_se = float(target_se) / 100 if target_se else None
+    return year, start_week, epochs, target_se
+
+@app.route('/games')
+def games():
+    # the remaining games a what-if query can pin, by index
+    year, start_week = read_season_args()
+    what_if, job = get_what_if(year, start_week)
+    if what_if is None:
+        return building(job)
+    return jsonify(what_if.games())
+
+@app.route('/what_if', methods=['POST'])
+def what_if():
+    # odds with the games in pins (a json object of game index -> winner
+    # abbreviation or team1 win chance) decided, from the season's stored run
+    year = int(request.form['year'])
+    start_week = datetime.strptime(request.form['start_week'], "%Y-%m-%d")
+    what_if, job = get_what_if(year, start_week)
+    if what_if is None:
+        return building(job)
+    try:
+        pins = what_if.check_pins(json.loads(request.form.get('pins') or "{}"))
+        results = what_if.odds(pins, resimulate=False)
+    except ValueError as e:
+        abort(400, str(e))
+    if results is None:
+        return building(get_resimulation(year, start_week, what_if, pins))
+    return jsonify({"table": results.table_repr(), "epochs": results.epochs, "samples": results.samples(),
+                    "resimulated": not results.weighted})
+
+@app.route('/leverage')
+def leverage():
+    # the remaining games that move the playoff odds most, from the season's stored run
+    year, start_week = read_season_args()
+    top = request.args.get('top', type=int)
+    what_if, job = get_what_if(year, start_week)
+    if what_if is None:
+        return building(job)
+    return jsonify(what_if.leverage(top))
+
+def get_what_if(year, start_week):
+    # (the stored run for this season, None) when it is built, otherwise
+    # (None, the job building it). The run is built on the job queue rather
+    # than the request thread, by one job per season however many requests
+    # ask, and rebuilt when its Season was dropped from season_cache (e.g.
+    # the elo file changed)
+    season = season_cache.get(year, start_week)
+    key = (year, start_week)
+    def build(job):
+        job.update(0, nflsim.num_epochs, None)
+        what_if = WhatIf(year, start_week, season=season)
+        with what_ifs_lock:
+            what_ifs[key] = what_if
+            what_ifs.move_to_end(key)
+            if len(what_ifs) > max_what_ifs:
+                what_ifs.popitem(last=False)
+        job.update(nflsim.num_epochs, nflsim.num_epochs, None)
+    with what_ifs_lock:
+        what_if = what_ifs.get(key)
+        if what_if is not None and what_if.season is season:
+            what_ifs.move_to_end(key)
+            return what_if, None
+        job = what_if_jobs.get(key)
+        if job is None or job.finished():
+            try:
+                job = jobs.submit(build)
+            except QueueFull as e:
+                abort(503, str(e))
+            what_if_jobs[key] = job
+        return None, job
+
+def get_resimulation(year, start_week, what_if, pins):
+    # the job resimulating what_if under checked pins, queued unless one is
+    # already on its way. Asking again once it's done finds the run in the
+    # WhatIf's cache
+    key = (year, start_week, tuple(sorted(pins.items())))
+    def resimulate(job):
+        job.update(0, what_if.resim_epochs, None)
+        what_if.resimulate(pins)
+        job.update(what_if.resim_epochs, what_if.resim_epochs, None)
+    with what_ifs_lock:
+        job = what_if_jobs.get(key)
+        if job is None or job.finished():
+            try:
+                job = jobs.submit(resimulate)
+            except QueueFull as e:
+                abort(503, str(e))
+            what_if_jobs[key] = job
+        return job
+
+def building(job):
+    # the answer while a season's stored run or a what-if's resimulation is
+    # being built: poll the job, then ask again
+    return jsonify({"job_id": job.id, "status": job.status}), 202
+
+@app.route('/win_matrix')
+def win_matrix():
+    # each team's chance of beating every other on its playoff elo, no simulation
+    abbs, matrix = load_season_matrix()
+    return jsonify({"teams": abbs, "win_prob": matrix.round(4).tolist()})
+
+@app.route('/matchup')
+def matchup():
+    abbs, matrix = load_season_matrix()
+    team1 = request.args.get('team1', '').upper()
+    team2 = request.args.get('team2', '').upper()
+    if team1 not in abbs or team2 not in abbs:
+        abort(400, "unknown team")
+    prob1 = float(matrix[abbs.index(team1), abbs.index(team2)])
+    return jsonify({"team1": team1, "team2": team2, "team1_win_prob": round(prob1, 4)})
+
+@app.route('/cache_info')
+def cache_info():
+    return jsonify(season_cache.cache_info())
+
+def read_season_args():
+    year = int(request.args['year'])
+    start_week = datetime.strptime(request.args['start_week'], "%Y-%m-%d")
+    return year, start_week
+
+def load_season_matrix():
+    year, start_week = read_season_args()
+    return load_win_matrix(year, start_week, season=season_cache.get(year, start_week))
+
 if __name__ == '__main__':
     app.run(debug=True)
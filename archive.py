@@ -0,0 +1,157 @@
+import json
+import os
+
+import numpy as np
+
+import elo_store
+import nflsim
+
+# Raw per-epoch results of a run, for analysis beyond PlayoffResults. The
+# file is a json header followed by one fixed-size record per epoch:
+#   outcomes - the remaining games bit-packed, bit g set when team1 of game g won
+#   seeds    - the 14 seeded team ids, AFC 1-7 then NFC 1-7
+#   winners  - the 13 playoff game winners in playoff_games order
+# Epochs are appended a chunk at a time as the run goes and read back through
+# a memory map, so queries walk the file in chunks without loading it. With
+# playoffs="exact" the winners are the games as the run's draws played them.
+
+archive_magic = b"NFLSIM01"
+archive_version = 1
+# header length is written as 8 bytes after the magic, records start aligned to this
+block_align = 64
+
+def record_dtype(num_games):
+    return np.dtype([("outcomes", "u1", (-(-num_games // 8),)), ("seeds", "u1", (14,)),
+                     ("winners", "u1", (nflsim.num_playoff_games,))])
+
+class ArchiveWriter:
+    # Writes the epochs of a run on season to path, filled through
+    # sim_season(bank=...). The file is written next to path and moved into
+    # place by close(), so readers never see a run that didn't finish
+    def __init__(self, path, season, seed, elo_file=nflsim.elo_file, options=None):
+        self.path = path
+        self.tmp = path + "." + str(os.getpid()) + ".tmp"
+        schedule = season.schedule
+        self.dtype = record_dtype(schedule.num_games)
+        dates = season.rem_games["dateObject"].dt.strftime("%Y-%m-%d").tolist()
+        header = {"version": archive_version, "year": season.year, "start_date": season.start_date.strftime("%Y-%m-%d"),
+                  "seed": seed, "elo_sha1": elo_store.file_hash(elo_file), "options": options or {},
+                  "teams": season.league_info.abbs, "games": [list(game) for game in zip(dates, schedule.t1abbs, schedule.t2abbs)],
+                  "record_size": self.dtype.itemsize}
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = -(-(len(archive_magic) + 8 + len(header_bytes)) // block_align) * block_align
+        self.file = open(self.tmp, "wb")
+        self.file.write(archive_magic)
+        self.file.write(len(header_bytes).to_bytes(8, "little"))
+        self.file.write(header_bytes)
+        self.file.write(bytes(data_start - self.file.tell()))
+        self.epochs = 0
+    def add(self, outcomes, afc, nfc, reached, wins, winners):
+        records = np.empty(len(afc), dtype=self.dtype)
+        records["outcomes"] = np.packbits(outcomes, axis=1)
+        records["seeds"] = np.concatenate([afc, nfc], axis=1)
+        records["winners"] = winners
+        self.file.write(records.tobytes())
+        self.epochs += len(afc)
+    def close(self):
+        self.file.close()
+        os.replace(self.tmp, self.path)
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp)
+    def __enter__(self):
+        return self
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.abort()
+
+def write_archive(path, year, start_date, epochs, seed=None, chunk_size=1000, playoffs="sampled", elo_mode="static",
+                  season=None, elo_file=nflsim.elo_file):
+    # runs sim_season and archives every epoch to path, returns the results.
+    # Without a seed a fresh one is drawn and stored, so the run can be repeated
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    if season is None:
+        season = nflsim.Season(year, start_date, elo_file)
+    options = {"epochs": epochs, "chunk_size": chunk_size, "playoffs": playoffs, "elo_mode": elo_mode}
+    with ArchiveWriter(path, season, seed, elo_file, options) as writer:
+        return nflsim.sim_season(year, start_date, epochs, seed=seed, chunk_size=chunk_size, playoffs=playoffs,
+                                 elo_mode=elo_mode, season=season, bank=writer, elo_file=elo_file)
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(archive_magic)) != archive_magic:
+            raise ValueError(path + " isn't an epoch archive")
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("version") != archive_version:
+        raise ValueError("unsupported archive version " + str(header.get("version")))
+    data_start = -(-(len(archive_magic) + 8 + length) // block_align) * block_align
+    return header, data_start
+
+class Archive:
+    # Read side of an archive: the records are memory-mapped and the queries
+    # below work through them chunk_size epochs at a time. Query masks are
+    # epochs-long booleans, e.g. from where()
+    def __init__(self, path, chunk_size=100000):
+        self.path = path
+        self.header, data_start = read_header(path)
+        self.teams = self.header["teams"]
+        self.games = self.header["games"]
+        self.num_games = len(self.games)
+        self.chunk_size = chunk_size
+        dtype = record_dtype(self.num_games)
+        self.epochs = (os.path.getsize(path) - data_start) // dtype.itemsize
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=data_start, shape=(self.epochs,))
+    def chunks(self):
+        for start in range(0, self.epochs, self.chunk_size):
+            yield slice(start, min(start + self.chunk_size, self.epochs))
+    def outcomes(self, games=None, epochs=slice(None)):
+        # epochs x games booleans, True where team1 won (every game by default)
+        packed = self.records["outcomes"][epochs]
+        if games is None:
+            return np.unpackbits(packed, axis=1, count=self.num_games).astype(bool)
+        games = np.asarray(games, dtype=np.intp)
+        return (packed[:, games >> 3] >> (7 - (games & 7)) & 1).astype(bool)
+    def seeds(self, epochs=slice(None)):
+        # epochs x 14 team ids, AFC 1-7 then NFC 1-7
+        return self.records["seeds"][epochs]
+    def winners(self, epochs=slice(None)):
+        # epochs x 13 playoff game winners, see nflsim.playoff_games
+        return self.records["winners"][epochs]
+    def where(self, results):
+        # mask of the epochs where every game in results (game index -> True
+        # for a team1 win, False for a loss) went that way
+        games = sorted(results)
+        wanted = np.array([results[g] for g in games], dtype=bool)
+        mask = np.empty(self.epochs, dtype=bool)
+        for chunk in self.chunks():
+            mask[chunk] = (self.outcomes(games, chunk) == wanted).all(axis=1)
+        return mask
+    def seed_counts(self, mask=None):
+        # teams x 8: epochs each team was seed 1-7, then out of the playoffs
+        n = len(self.teams)
+        counts = np.zeros(n * 8, dtype=np.int64)
+        seed_index = np.tile(np.arange(7), 2)
+        for chunk in self.chunks():
+            seeds = self.seeds(chunk).astype(np.intp)
+            if mask is not None:
+                seeds = seeds[mask[chunk]]
+            counts += np.bincount((seeds * 8 + seed_index).ravel(), minlength=n * 8)
+        counts = counts.reshape(n, 8)
+        counts[:, 7] = (self.epochs if mask is None else np.count_nonzero(mask)) - counts[:, :7].sum(axis=1)
+        return counts
+    def win_counts(self, mask=None):
+        # teams x 4: playoff games won in the wild card, divisional and
+        # conference rounds and the Super Bowl
+        n = len(self.teams)
+        rounds = np.repeat(np.arange(4), [6, 4, 2, 1])
+        counts = np.zeros(n * 4, dtype=np.int64)
+        for chunk in self.chunks():
+            winners = self.winners(chunk).astype(np.intp)
+            if mask is not None:
+                winners = winners[mask[chunk]]
+            counts += np.bincount((winners * 4 + rounds).ravel(), minlength=n * 4)
+        return counts.reshape(n, 4)
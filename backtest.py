@@ -0,0 +1,107 @@
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import nflsim
+from tiebreakers import Tiebreakers
+
+# Checks the tiebreakers against history: every past season's final
+# standings are built from the elo file (read once, through its columnar
+# store) and seeded with get_playoff_seeds in parallel, and the seeds are
+# diffed against the actual NFL seeds in seeds_file. Seasons before 2020
+# had 6 seeds per conference, only those are compared.
+#   python backtest.py [--elo-file nfl_elo.csv] [--workers 4] [--years 2002 2022]
+
+seeds_file = "playoff_seeds.csv"
+conf_names = ["AFC", "NFC"]
+# coin flips in the tiebreakers come from this, so a backtest always repeats
+backtest_seed = 0
+
+def load_seeds(path=seeds_file):
+    # {(season, conf): [abbreviations by seed]} of the actual playoff seeds
+    table = pd.read_csv(path)
+    cols = [col for col in table.columns if col.startswith("SEED")]
+    seeds = {}
+    for row in table.itertuples(index=False):
+        row = row._asdict()
+        seeds[(int(row["SEASON"]), row["CONF"])] = [row[col] for col in cols if isinstance(row[col], str)]
+    return seeds
+
+def seed_season(year, games, info_file=nflsim.info_file):
+    # the final seeds of one season from its regular season games, as
+    # (year, {conf: abbreviations}, whether a coin flip decided anything)
+    league_info = nflsim.LeagueInfo(info_file)
+    standings = nflsim.Standings(league_info, games)
+    tiebreakers = Tiebreakers(league_info.team_info, rng=random.Random(backtest_seed + year))
+    afc, nfc = tiebreakers.get_playoff_seeds(standings)
+    return year, {"AFC": [t.abb for t in afc], "NFC": [t.abb for t in nfc]}, tiebreakers.coin_flipped
+
+def season_games(elo, years):
+    # each season's regular season games, only the columns Standings reads
+    elo = elo[elo["season"].isin(years)]
+    return {int(year): games[["team1", "team2", "score1", "score2"]] for year, games in elo.groupby("season")}
+
+def run(years=None, workers=1, elo_file=nflsim.elo_file, info_file=nflsim.info_file, seeds=None):
+    # seeds every season in years (by default every season in seeds) and
+    # returns {year: (seeds by conf, coin flipped)}
+    if seeds is None:
+        seeds = load_seeds()
+    if years is None:
+        years = sorted({season for season, _ in seeds})
+    games = season_games(nflsim.load_elo(elo_file), years)
+    if workers == 1:
+        seeded = [seed_season(year, games[year], info_file) for year in sorted(games)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(seed_season, year, games[year], info_file) for year in sorted(games)]
+            seeded = [future.result() for future in futures]
+    return {year: (confs, flipped) for year, confs, flipped in seeded}
+
+def diff(seeded, seeds):
+    # mismatches between seeded (from run) and the actual seeds, as dicts
+    # with the season, conference, actual and simulated seeds, whether a
+    # coin flip was involved; a season missing from the elo file has no
+    # simulated seeds
+    mismatches = []
+    for (year, conf), actual in sorted(seeds.items()):
+        if year not in seeded:
+            mismatches.append({"season": year, "conf": conf, "actual": actual, "simulated": None, "coin_flip": False})
+            continue
+        confs, flipped = seeded[year]
+        simulated = confs[conf][:len(actual)]
+        if simulated != actual:
+            mismatches.append({"season": year, "conf": conf, "actual": actual, "simulated": simulated,
+                               "coin_flip": flipped})
+    return mismatches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff the tiebreakers' seeds against actual NFL seeds")
+    parser.add_argument("--elo-file", default=nflsim.elo_file)
+    parser.add_argument("--seeds", default=seeds_file, help="csv of the actual seeds")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--years", nargs=2, type=int, metavar=("FIRST", "LAST"))
+    args = parser.parse_args(argv)
+
+    time0 = time.time()
+    seeds = load_seeds(args.seeds)
+    if args.years is not None:
+        seeds = {key: value for key, value in seeds.items() if args.years[0] <= key[0] <= args.years[1]}
+    seeded = run(sorted({season for season, _ in seeds}), args.workers, args.elo_file, seeds=seeds)
+    mismatches = diff(seeded, seeds)
+    for m in mismatches:
+        line = str(m["season"]) + " " + m["conf"] + ": actual " + " ".join(m["actual"]) + ", "
+        if m["simulated"] is None:
+            line += "season not in " + args.elo_file
+        else:
+            line += "simulated " + " ".join(m["simulated"]) + (" (coin flip)" if m["coin_flip"] else "")
+        print(line)
+    print(str(len(seeds) - len(mismatches)) + "/" + str(len(seeds)) + " conferences match")
+    print("Total Time: " + str(round(time.time() - time0, 2)) + "s")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
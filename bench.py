@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+import nflsim
+from tiebreakers import Tiebreakers
+
+# Benchmarks of the simulation hot paths on the bundled 2022 data, with fixed
+# seeds so every run does the same work. Each case is timed `repeat` times
+# and the fastest and median times are appended to a json history, which
+# `compare` reads back to flag cases that got slower.
+#   python bench.py run [--label L] [--epochs 1000 10000] [--dates 2022-09-01 ...]
+#   python bench.py compare [--base -2] [--new -1] [--threshold 0.1]
+# Cases, each per start date and (except load / standings) per epoch count:
+#   load           - reading the elo store and splitting the season
+#   standings      - Standings from the past results
+#   regular_season - drawing the remaining games and counting win totals
+#   seeding        - Tiebreakers.get_playoff_seeds, one epoch at a time
+#   seeding_batch  - Tiebreakers.get_playoff_seeds_batch, what sim_season uses
+#   playoffs       - playoff_games and rounds_reached from the batch seeds
+#   end_to_end     - sim_season, loading included
+
+bench_elo_file = "nfl_elo_22-23.csv"
+bench_year = 2022
+# early (the whole season left), mid season and the final week
+bench_dates = ["2022-09-01", "2022-11-01", "2023-01-07"]
+bench_epochs = [1000, 10000]
+bench_seed = 0
+history_file = "bench_history.json"
+# a case is a regression when its best time grows by more than this fraction
+regression_threshold = 0.1
+# times this short are too noisy to flag
+min_time = 0.001
+case_names = ["load", "standings", "regular_season", "seeding", "seeding_batch", "playoffs", "end_to_end"]
+
+def time_case(fn, repeat):
+    # the fastest and median wall time of repeat calls to fn
+    times = []
+    for _ in range(repeat):
+        time0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - time0)
+    return {"min": min(times), "median": statistics.median(times)}
+
+def seed_one_by_one(tiebreakers, standings, schedule, outcomes, clinches):
+    # get_playoff_seeds on every epoch of outcomes
+    for won in outcomes:
+        standings.add_results(schedule.t1, schedule.t2, won, schedule.played)
+        tiebreakers.get_playoff_seeds(standings, clinches)
+        standings.reset()
+
+def date_cases(year, start_date, epoch_counts, seed=bench_seed, elo_file=bench_elo_file):
+    # (name, epochs, fn) for every case of one start date, epochs None for the
+    # cases that don't depend on it. Inputs are built here, fn only does the
+    # timed work
+    season = nflsim.Season(year, start_date, elo_file)
+    schedule = season.schedule
+    team_info = season.league_info.team_info
+    cases = [("load", None, lambda: nflsim.split_season(nflsim.load_elo(elo_file), year, start_date)),
+             ("standings", None, lambda: nflsim.Standings(season.league_info, season.past_results))]
+    for epochs in epoch_counts:
+        rng = np.random.default_rng(seed)
+        outcomes = schedule.sim_outcomes(epochs, rng)
+        draws = nflsim.draw_uniforms(rng, epochs, nflsim.num_playoff_games)
+        standings = season.standings()
+        standings.set_elos(list(season.final_elos))
+        afc, nfc = Tiebreakers(team_info, rng=random.Random(seed)).get_playoff_seeds_batch(
+            standings, schedule, outcomes, season.clinches)
+        win = standings.win_matrix()
+
+        def regular_season(epochs=epochs):
+            schedule.win_totals(schedule.sim_outcomes(epochs, np.random.default_rng(seed)), standings.base_wins)
+        # a fresh Tiebreakers each call, so the tie cache starts empty every time
+        def seeding(outcomes=outcomes):
+            seed_one_by_one(Tiebreakers(team_info, rng=random.Random(seed)), standings, schedule, outcomes,
+                            season.clinches)
+        def seeding_batch(outcomes=outcomes):
+            Tiebreakers(team_info, rng=random.Random(seed)).get_playoff_seeds_batch(standings, schedule, outcomes,
+                                                                                   season.clinches)
+        def playoffs(afc=afc, nfc=nfc, draws=draws):
+            nflsim.rounds_reached(afc, nfc, nflsim.playoff_games(win, afc, nfc, draws))
+        def end_to_end(epochs=epochs):
+            nflsim.sim_season(year, start_date, epochs, seed=seed, elo_file=elo_file)
+        cases += [("regular_season", epochs, regular_season), ("seeding", epochs, seeding),
+                  ("seeding_batch", epochs, seeding_batch), ("playoffs", epochs, playoffs),
+                  ("end_to_end", epochs, end_to_end)]
+    return cases
+
+def case_key(name, start_date, epochs):
+    key = name + "/" + start_date.strftime("%Y-%m-%d")
+    return key if epochs is None else key + "/" + str(epochs)
+
+def git_commit():
+    # the checked out commit, None outside a git checkout
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+def run(dates=bench_dates, epoch_counts=bench_epochs, repeat=3, cases=case_names, label=None, seed=bench_seed,
+        elo_file=bench_elo_file, progress=None):
+    # times every case and returns the history entry. progress(key, timing)
+    # is called after each case
+    timings = {}
+    for date in dates:
+        start_date = datetime.strptime(date, "%Y-%m-%d")
+        for name, epochs, fn in date_cases(bench_year, start_date, epoch_counts, seed, elo_file):
+            if name not in cases:
+                continue
+            key = case_key(name, start_date, epochs)
+            timings[key] = time_case(fn, repeat)
+            if progress is not None:
+                progress(key, timings[key])
+    return {"time": datetime.now().isoformat(timespec="seconds"), "label": label, "commit": git_commit(),
+            "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+            "repeat": repeat, "seed": seed, "timings": timings}
+
+def load_history(path=history_file):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["runs"]
+
+def save_run(entry, path=history_file):
+    # appends entry to the history at path, replaced in one rename
+    runs = load_history(path) + [entry]
+    tmp = path + "." + str(os.getpid()) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"runs": runs}, f, indent=1)
+    os.replace(tmp, path)
+
+def compare(base, new, threshold=regression_threshold, min_time=min_time):
+    # rows of (key, base time, new time, new / base, flag) for the cases both
+    # runs timed, on their fastest times. flag is "slower" past threshold
+    # and "faster" past it the other way, "" otherwise or when both times
+    # are under min_time
+    rows = []
+    for key, timing in new["timings"].items():
+        if key not in base["timings"]:
+            continue
+        before, after = base["timings"][key]["min"], timing["min"]
+        ratio = after / before if before > 0 else float("inf")
+        flag = ""
+        if max(before, after) >= min_time:
+            if ratio > 1 + threshold:
+                flag = "slower"
+            elif ratio < 1 / (1 + threshold):
+                flag = "faster"
+        rows.append((key, before, after, ratio, flag))
+    return rows
+
+def run_name(entry):
+    name = entry["time"]
+    if entry.get("label"):
+        name += " " + entry["label"]
+    if entry.get("commit"):
+        name += " (" + entry["commit"] + ")"
+    return name
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the simulation hot paths")
+    parser.add_argument("--history", default=history_file, help="json history file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time every case and append the results to the history")
+    run_parser.add_argument("--label", help="name stored with the run")
+    run_parser.add_argument("--dates", nargs="+", default=bench_dates, help="start dates, YYYY-MM-DD")
+    run_parser.add_argument("--epochs", nargs="+", type=int, default=bench_epochs)
+    run_parser.add_argument("--cases", nargs="+", default=case_names, choices=case_names)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--no-save", action="store_true", help="print the timings without saving them")
+    compare_parser = commands.add_parser("compare", help="compare two runs in the history")
+    compare_parser.add_argument("--base", type=int, default=-2, help="history index of the baseline run")
+    compare_parser.add_argument("--new", type=int, default=-1, help="history index of the run to check")
+    compare_parser.add_argument("--threshold", type=float, default=regression_threshold)
+    compare_parser.add_argument("--min-time", type=float, default=min_time)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        def print_timing(key, timing):
+            print("{:<40} {:>10.4f}s  (median {:.4f}s)".format(key, timing["min"], timing["median"]))
+        entry = run(args.dates, args.epochs, args.repeat, args.cases, args.label, progress=print_timing)
+        if not args.no_save:
+            save_run(entry, args.history)
+        return 0
+
+    runs = load_history(args.history)
+    try:
+        base, new = runs[args.base], runs[args.new]
+    except IndexError:
+        print("need two runs in " + args.history + ", found " + str(len(runs)))
+        return 2
+    print("base: " + run_name(base))
+    print("new:  " + run_name(new))
+    rows = compare(base, new, args.threshold, args.min_time)
+    for key, before, after, ratio, flag in rows:
+        print("{:<40} {:>10.4f}s {:>10.4f}s {:>7.2f}x  {}".format(key, before, after, ratio, flag))
+    regressions = [row for row in rows if row[4] == "slower"]
+    print(str(len(regressions)) + " regression(s) past " + "{:.0%}".format(args.threshold))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
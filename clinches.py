@@ -0,0 +1,152 @@
+import itertools
+from collections import deque
+
+import numpy as np
+
+# Playoff spots, division titles and byes that are already decided by the
+# baseline standings and the remaining schedule, whatever the results.
+# Records are compared by win percentage (ties count half) and every tie
+# is assumed to go against the team, so a clinch or elimination is only
+# reported when no tiebreaker could change it. Clinches come from record
+# bounds, eliminations from max-flow: can the other teams' remaining games
+# be split so that none of them finishes ahead of a team that wins out?
+
+# small tolerance on win percentage comparisons, in the conservative direction
+eps = 1e-9
+
+def max_flow(capacity, source, sink):
+    # Edmonds-Karp over a dense capacity matrix (changed in place)
+    flow = 0
+    n = capacity.shape[0]
+    while True:
+        parent = [-1] * n
+        parent[source] = source
+        queue = deque([source])
+        while queue and parent[sink] < 0:
+            u = queue.popleft()
+            for v in np.flatnonzero(capacity[u] > 0).tolist():
+                if parent[v] < 0:
+                    parent[v] = u
+                    queue.append(v)
+        if parent[sink] < 0:
+            return flow
+        path = []
+        v = sink
+        while v != source:
+            path.append((parent[v], v))
+            v = parent[v]
+        push = min(capacity[u, v] for u, v in path)
+        for u, v in path:
+            capacity[u, v] -= push
+            capacity[v, u] += push
+        flow += push
+
+def can_hold(teams, games, caps):
+    # True when the games (team x team counts of remaining games, each pair
+    # counted once) among teams can be split so team t wins at most caps[t]
+    if any(caps[t] < 0 for t in teams):
+        return False
+    # a team that can win every game it has left takes its games off the others
+    teams = [t for t in teams if caps[t] < games[t].sum() + games[:, t].sum()]
+    pairs = [(a, b) for a, b in itertools.combinations(teams, 2) if games[a, b] + games[b, a] > 0]
+    if not pairs:
+        return True
+    # source, one node per pair, one per team, sink
+    index = {t: 1 + len(pairs) + k for k, t in enumerate(teams)}
+    sink = 1 + len(pairs) + len(teams)
+    capacity = np.zeros((sink + 1, sink + 1), dtype=np.int64)
+    total = 0
+    for k, (a, b) in enumerate(pairs):
+        count = int(games[a, b] + games[b, a])
+        total += count
+        capacity[0, 1 + k] = count
+        capacity[1 + k, index[a]] = count
+        capacity[1 + k, index[b]] = count
+    for t in teams:
+        capacity[index[t], sink] = caps[t]
+    return max_flow(capacity, 0, sink) == total
+
+class Clinches:
+    # Per team id booleans: clinched a division / playoff spot / first-round
+    # bye, and eliminated from each (out_*). standings holds the results so
+    # far, schedule the remaining games
+    def __init__(self, standings, schedule):
+        teams = standings.team_list
+        n = len(teams)
+        remaining = schedule.played.astype(np.int64)
+        # each pair's remaining games counted once, in the upper triangle
+        self.games = np.triu(remaining)
+        pts = standings.wins + 0.5 * standings.ties
+        rem = remaining.sum(axis=1)
+        total = standings.wins + standings.losses + standings.ties + rem
+        self.pts, self.total = pts, np.maximum(total, 1)
+        self.low = pts / self.total
+        self.high = (pts + rem) / self.total
+        self.divs = np.array([standings.league_info.team_info[t.abb]["DIV"] for t in teams])
+        self.confs = np.array([t.conf for t in teams])
+
+        self.division = np.zeros(n, dtype=bool)
+        self.playoffs = np.zeros(n, dtype=bool)
+        self.bye = np.zeros(n, dtype=bool)
+        self.out_division = np.zeros(n, dtype=bool)
+        self.out_playoffs = np.zeros(n, dtype=bool)
+        self.out_bye = np.zeros(n, dtype=bool)
+        for i in range(n):
+            rivals = np.flatnonzero((self.divs == self.divs[i]) & (np.arange(n) != i))
+            conf = np.flatnonzero((self.confs == self.confs[i]) & (np.arange(n) != i))
+            # clinches: no one can finish level with or ahead of i's worst case
+            self.division[i] = (self.high[rivals] < self.low[i] - eps).all()
+            self.bye[i] = (self.high[conf] < self.low[i] - eps).all()
+            # non-division winners that may finish level with or ahead of i:
+            # at most one team per division that can is the division winner
+            level = [np.count_nonzero(self.high[np.flatnonzero((self.divs == d) & (np.arange(n) != i))] >= self.low[i] - eps)
+                     for d in set(self.divs[conf].tolist()) | {self.divs[i]}]
+            self.playoffs[i] = self.division[i] or sum(max(k - 1, 0) for k in level) <= 2
+            # eliminations: i wins out and still can't be level with the others
+            target = self.high[i]
+            self.out_division[i] = not self.can_hold(rivals, i, target)
+            self.out_bye[i] = not self.can_hold(conf, i, target)
+            if self.out_division[i]:
+                above = sum(max(self.min_above(np.flatnonzero((self.divs == d) & (np.arange(n) != i)), i, target) - 1, 0)
+                            for d in set(self.divs[conf].tolist()))
+                self.out_playoffs[i] = above >= 3
+        self.playoffs |= self.division | self.bye
+        self.division |= self.bye
+        self.out_bye |= self.out_division
+    def caps(self, teams, target):
+        # most remaining wins each of teams can add without passing target
+        caps = np.full(len(self.pts), -1, dtype=np.int64)
+        caps[teams] = np.floor(target * self.total[teams] - self.pts[teams] + eps).astype(np.int64)
+        return caps
+    def can_hold(self, teams, i, target):
+        # can every one of teams finish at or below target while i wins out?
+        # Their games against i are losses, those against anyone outside
+        # teams go to the other side
+        return can_hold(teams.tolist(), self.games, self.caps(teams, target))
+    def min_above(self, teams, i, target):
+        # fewest of teams that must finish above target while i wins out,
+        # letting them lose every game outside the group
+        caps = self.caps(teams, target)
+        teams = teams.tolist()
+        for size in range(len(teams) + 1):
+            for above in itertools.combinations(teams, size):
+                # games against the teams above go to them
+                if can_hold([t for t in teams if t not in above], self.games, caps):
+                    return size
+        return len(teams)
+    def status(self):
+        # standings-style marks per team id: z bye, y division, x playoff spot,
+        # e eliminated, "" still open
+        marks = []
+        for i in range(len(self.pts)):
+            if self.bye[i]:
+                marks.append("z")
+            elif self.division[i]:
+                marks.append("y")
+            elif self.playoffs[i]:
+                marks.append("x")
+            elif self.out_playoffs[i]:
+                marks.append("e")
+            else:
+                marks.append("")
+        return marks
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Columnar binary copy of a 538 elo csv. The csv is converted once into
+# <csv>.bin: a json header followed by one little-endian block per column,
+# which load() memory-maps, so every process reading the same store shares
+# the same pages. The store remembers the csv's size, mtime and sha1 and is
+# rebuilt whenever the csv changes.
+
+store_magic = b"NFLELO01"
+store_version = 1
+# header length is written as 8 bytes after the magic, blocks are aligned to this
+block_align = 64
+playoff_rounds = ["w", "d", "c", "s"]
+int_columns = {"season": "<i2", "neutral": "<i1", "score1": "<i2", "score2": "<i2", "playoff": "<i1"}
+team_columns = ["team1", "team2"]
+# float columns are float32, text columns other than teams (qb names) are dropped
+
+def store_path(csv_path):
+    return csv_path + ".bin"
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def convert(csv_path, path=None):
+    # reads the csv once and writes its columnar store, returns the store path
+    path = path or store_path(csv_path)
+    stat = os.stat(csv_path)
+    elo = pd.read_csv(csv_path)
+    teams = sorted(set(elo["team1"]) | set(elo["team2"]))
+    codes = {team: i for i, team in enumerate(teams)}
+    arrays = {}
+    arrays["date"] = (pd.to_datetime(elo["date"], format="%Y-%m-%d") - pd.Timestamp("1970-01-01")).dt.days.to_numpy("<i4")
+    for col in team_columns:
+        arrays[col] = elo[col].map(codes).to_numpy("<i1")
+    for col, dtype in int_columns.items():
+        if col == "playoff":
+            # 0 in the regular season, 1-4 for each playoff round
+            values = elo[col].map({r: i + 1 for i, r in enumerate(playoff_rounds)}).fillna(0)
+        else:
+            # -1 for games that haven't been scored yet
+            values = elo[col].fillna(-1)
+        arrays[col] = values.to_numpy(dtype)
+    for col in elo.columns:
+        if col not in arrays and pd.api.types.is_numeric_dtype(elo[col]):
+            arrays[col] = elo[col].to_numpy("<f4")
+
+    columns = []
+    offset = 0
+    for col, values in arrays.items():
+        columns.append({"name": col, "dtype": values.dtype.str, "offset": offset})
+        offset += -(-values.nbytes // block_align) * block_align
+    header = {"version": store_version, "rows": int(elo.shape[0]), "teams": teams, "columns": columns,
+              "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns, "source_sha1": file_hash(csv_path)}
+
+    # write next to the target and rename, so a reader never sees half a store
+    tmp = tmp_path(path)
+    with open(tmp, "wb") as f:
+        data_start = write_header(f, header)
+        for column, values in zip(columns, arrays.values()):
+            f.seek(data_start + column["offset"])
+            f.write(values.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+def tmp_path(path):
+    return path + "." + str(os.getpid()) + ".tmp"
+
+def write_header(f, header):
+    # writes the magic, length and header at the start of f, returns where the columns start
+    header_bytes = json.dumps(header).encode("utf-8")
+    f.write(store_magic)
+    f.write(len(header_bytes).to_bytes(8, "little"))
+    f.write(header_bytes)
+    return -(-(len(store_magic) + 8 + len(header_bytes)) // block_align) * block_align
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(store_magic)) != store_magic:
+            return None, 0
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length).decode("utf-8"))
+    data_start = -(-(len(store_magic) + 8 + length) // block_align) * block_align
+    return header, data_start
+
+def is_current(header, csv_path):
+    # size and mtime match, or the csv was touched without changing (load
+    # then records the new mtime)
+    if header is None or header.get("version") != store_version:
+        return False
+    stat = os.stat(csv_path)
+    if stat.st_size != header["source_size"]:
+        return False
+    if stat.st_mtime_ns == header["source_mtime_ns"]:
+        return True
+    return file_hash(csv_path) == header["source_sha1"]
+
+def write_mtime(path, header, mtime_ns):
+    # records a new csv mtime in the store's header. The columns are copied
+    # under the new header and renamed over the store like convert does, never
+    # written in place: stores already mapped keep the old file, and a reader
+    # never sees a torn header
+    _, old_start = read_header(path)
+    header = dict(header, source_mtime_ns=mtime_ns)
+    tmp = tmp_path(path)
+    with open(path, "rb") as src, open(tmp, "wb") as f:
+        data_start = write_header(f, header)
+        src.seek(old_start)
+        f.seek(data_start)
+        shutil.copyfileobj(src, f)
+    os.replace(tmp, path)
+
+class EloStore:
+    # memory-mapped columns of a converted elo csv
+    def __init__(self, path):
+        self.path = path
+        header, data_start = read_header(path)
+        self.header = header
+        self.rows = header["rows"]
+        self.teams = header["teams"]
+        self.columns = {}
+        for column in header["columns"]:
+            self.columns[column["name"]] = np.memmap(path, dtype=np.dtype(column["dtype"]), mode="r",
+                                                     offset=data_start + column["offset"], shape=(self.rows,))
+    def __getitem__(self, name):
+        return self.columns[name]
+    def frame(self, regular_season=True):
+        # the rows as load_elo has always returned them: team abbreviations,
+        # NaN for missing scores and playoff rounds, and the dates as dateObject
+        # (the date strings aren't rebuilt)
+        rows = self.columns["playoff"] == 0 if regular_season else slice(None)
+        teams = np.array(self.teams, dtype=object)
+        data = {}
+        for name, values in self.columns.items():
+            values = values[rows]
+            if name == "date":
+                data["dateObject"] = values.astype("datetime64[D]").astype("datetime64[ns]")
+            elif name in team_columns:
+                data[name] = teams[values]
+            elif name == "playoff":
+                data[name] = np.array([np.nan] + playoff_rounds, dtype=object)[values]
+            elif name in ("score1", "score2"):
+                data[name] = np.where(values < 0, np.nan, values)
+            elif name in int_columns:
+                data[name] = values.astype(np.int64)
+            else:
+                data[name] = values.astype(np.float64)
+        return pd.DataFrame(data)
+
+def load(csv_path):
+    # the store for csv_path, converting it first when missing or stale
+    path = store_path(csv_path)
+    header = None
+    if os.path.exists(path):
+        header, _ = read_header(path)
+    if not is_current(header, csv_path):
+        convert(csv_path, path)
+    else:
+        # touched without changing: keep the new mtime so later loads skip the hash
+        mtime_ns = os.stat(csv_path).st_mtime_ns
+        if mtime_ns != header["source_mtime_ns"]:
+            write_mtime(path, header, mtime_ns)
+    return EloStore(path)
@@ -0,0 +1,88 @@
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Background simulation jobs for the web app: submit returns at once, a
+# bounded pool of threads runs the jobs and anyone can wait on a job's next
+# update (polling or server-sent events)
+
+class QueueFull(Exception):
+    pass
+
+class Job:
+    # One queued / running / finished simulation. Its state only changes
+    # through update / finish / fail, each bumping version and waking waiters
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.table = None
+        self.error = None
+        self.version = 0
+        self.changed = threading.Condition()
+        # set by cancel(), the job's run checks it and stops
+        self.cancelled = threading.Event()
+    def _set(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.changed.notify_all()
+    def update(self, done, total, table):
+        # epochs done so far out of total and the odds table at that point
+        self._set(status="running", done=done, total=total, table=table)
+    def finish(self):
+        self._set(status="cancelled" if self.cancelled.is_set() else "done")
+    def cancel(self):
+        self.cancelled.set()
+    def fail(self, error):
+        self._set(status="failed", error=error)
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+    def state(self):
+        with self.changed:
+            return {"job_id": self.id, "status": self.status, "done": self.done, "total": self.total,
+                    "table": self.table, "error": self.error, "version": self.version}
+    def wait(self, version, timeout=None):
+        # the state once it moves past version, or as it is after timeout seconds
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.state()
+
+class JobQueue:
+    # Runs jobs on a pool of `workers` threads. At most max_pending jobs can be
+    # queued or running, and only the newest `keep` finished jobs are retained
+    def __init__(self, workers=2, max_pending=8, keep=64):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = max_pending
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.pending = 0
+    def submit(self, run):
+        # queues run(job), which reports through job.update, and returns the job
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise QueueFull("too many simulations queued")
+            job = Job()
+            self.jobs[job.id] = job
+            self.pending += 1
+            finished = [job_id for job_id, old in self.jobs.items() if old.finished()]
+            for job_id in finished[:max(len(finished) - self.keep, 0)]:
+                del self.jobs[job_id]
+        self.pool.submit(self._run, job, run)
+        return job
+    def _run(self, job, run):
+        try:
+            run(job)
+            job.finish()
+        except Exception as e:
+            job.fail(str(e))
+        finally:
+            with self.lock:
+                self.pending -= 1
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
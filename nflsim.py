@@ -1,62 +1,79 @@
 import pandas as pd
 import numpy as np
+import os
+import copy
 import random
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from tiebreakers import Tiebreakers, Result
+import elo_store
+from clinches import Clinches
+from simstats import SimStats, no_phase
 
 standings_url = "https://api.mysportsfeeds.com/v2.1/pull/nfl/2022-2023-regular/standings.json"
 key = "620395f2-bb1d-4a47-b464-697aec"
 division_names = ["AFC EAST", "AFC NORTH", "AFC WEST", "AFC SOUTH", "NFC EAST", "NFC NORTH", "NFC WEST", "NFC SOUTH"]
 num_epochs = 10000
+# largest standard error allowed on any team's SB / playoff odds when
+# sim_season runs with a target (a 95% CI half-width h is h / 1.96)
+target_se = 0.005
+min_epochs = 1000
+num_playoff_games = 13
+# 538 elo constants for elo_mode="dynamic"
+elo_k = 20
+home_field = 65
 elo_file = "nfl_elo.csv"
 info_file = "team_info.csv"
+# playoff rounds counted by PlayoffResults: the four a team can reach after
+# making the playoffs, and winning the last one. Reaching the Super Bowl is
+# the conference title
+round_names = ["divisional", "conference", "super_bowl", "champion"]
 
 class LeagueInfo:
     def __init__(self, info_file):
         raw_team_info = pd.read_csv(info_file)
-        # Turn raw_team_info into map of maps by team_id
-        self.team_info = {}
-        ids = raw_team_info["ABBR"]
-        rest = raw_team_info.drop("ABBR", axis=1)
-        for id in ids:
-            self.team_info[id] = {}
-        for row in range(raw_team_info.shape[0]):
-            for col in rest.columns:
-                self.team_info[ids[row]][col] = rest.loc[row, col]
+        # Turn raw_team_info into map of maps by team_id, built from whole columns
+        cols = [col for col in raw_team_info.columns if col != "ABBR"]
+        values = [raw_team_info[col].tolist() for col in cols]
+        self.team_info = {abb: dict(zip(cols, row)) for abb, row in zip(raw_team_info["ABBR"].tolist(), zip(*values))}
+        # Integer team ids follow the order of team_info.csv
+        self.abbs = list(self.team_info.keys())
+        self.ids = {abb: i for i, abb in enumerate(self.abbs)}
 
 class Team:
-    def __init__(self, name, abb, wins, losses, ties, divName, conf):
+    # Lightweight view of one team's row in the Standings arrays
+    __slots__ = ("standings", "id", "name", "abb", "divName", "conf")
+    def __init__(self, standings, id, name, abb, divName, conf):
+        self.standings = standings
+        self.id = id
         self.name = name
         self.abb = abb
-        self.wins = wins
-        self.losses = losses
-        self.ties = ties
-        self.playoff_elo = 0
-        self.playoff_seed = 0
         self.divName = divName
         self.conf = conf
-        self.games = []
-        self.wlt = 0
-    def add_game(self, game):
-        if game.t1abb == self.abb:
-            if game.result == Result.T1WIN:
-                self.wins += 1
-            elif game.result == Result.T1LOSS:
-                self.losses += 1
-            else:
-                self.ties += 1
-        else:
-            if game.result == Result.T1WIN:
-                self.losses += 1
-            elif game.result == Result.T1LOSS:
-                self.wins += 1
-            else:
-                self.ties += 1
-        self.games.append(game)
-        self._calc_wlt()
-    def _calc_wlt(self):
-        self.wlt = (self.wins + 0.5*self.ties) / len(self.games)
+    @property
+    def wins(self):
+        return int(self.standings.wins[self.id])
+    @property
+    def losses(self):
+        return int(self.standings.losses[self.id])
+    @property
+    def ties(self):
+        return int(self.standings.ties[self.id])
+    @property
+    def wlt(self):
+        return self.standings.wlt()[self.id]
+    @property
+    def playoff_elo(self):
+        return self.standings.elos[self.id]
+    @property
+    def playoff_seed(self):
+        return self.standings.seeds[self.id]
+    @playoff_seed.setter
+    def playoff_seed(self, seed):
+        self.standings.seeds[self.id] = seed
     def __repr__(self):
         if self.ties > 0:
             return self.name + " (" + str(self.wins) + "-" + str(self.losses) + "-" + str(self.ties) + ")"
@@ -68,23 +85,9 @@ class Team:
     def __eq__(self, other):
         return self.wlt == other.wlt
     def __hash__(self):
-        return hash(self.abb)
+        return self.id
     def same(self, other):
-        return self.abb == other.abb
-
-class Game:
-    def __init__(self, t1abb, t2abb, result):
-        self.t1abb = t1abb
-        self.t2abb = t2abb
-        self.result = result
-    def __repr__(self):
-        if self.result == Result.T1WIN:
-            return "(" + self.t1abb + " beat " + self.t2abb + ")"
-        if self.result == Result.T1LOSS:
-            return "(" + self.t2abb + " beat " + self.t1abb + ")"
-        return "(" + self.t1abb + " tied " + self.t2abb + ")"
-    def __str__(self):
-        return self.__repr__()
+        return self.id == other.id
 
 class Division:
     def __init__(self, name):
@@ -100,9 +103,23 @@ class Division:
         return self.__repr__()
 
 class Standings:
+    # Records are kept in arrays indexed by the LeagueInfo team ids:
+    # wins / losses / ties count vectors, h2h[i, j] = wins of i over j and
+    # played[i, j] = games between i and j (so ties are played - h2h - h2h.T)
     def __init__(self, league_info, past_results):
         self.league_info = league_info
-        # create conferences, fill divisions with teams, fill teams with info / games
+        self.ids = league_info.ids
+        n = len(league_info.abbs)
+        self.wins = np.zeros(n, dtype=np.int32)
+        self.losses = np.zeros(n, dtype=np.int32)
+        self.ties = np.zeros(n, dtype=np.int32)
+        self.h2h = np.zeros((n, n), dtype=np.int8)
+        self.played = np.zeros((n, n), dtype=np.int8)
+        self.elos = [0] * n
+        self.seeds = [0] * n
+        self._wlt = None
+        self._win_matrix = None
+        # create conferences, fill divisions with teams
         # Key it by team abbreviations
         self.teams = {}
         self.afc = {"AFC EAST":[], "AFC NORTH":[], "AFC WEST":[], "AFC SOUTH":[]}
@@ -111,13 +128,12 @@ class Standings:
         # Populate Team dict
         for abb in league_info.team_info:
             name = league_info.team_info[abb]["NAME"]
-            wins = 0
-            losses = 0
-            ties = 0
             divName = league_info.team_info[abb]["DIV"]
             conf = divName.split(" ")[0]
-            t = Team(name, abb, wins, losses, ties, divName, conf)
+            t = Team(self, self.ids[abb], name, abb, divName, conf)
             self.teams[abb] = t
+        # Teams by id
+        self.team_list = list(self.teams.values())
 
         # Populate AFC and NFC
         for team in self.teams.values():
@@ -127,24 +143,116 @@ class Standings:
                 self.nfc[team.divName].append(team)
 
         # Add past game results
-        for row in range(past_results.shape[0]):
-            t1 = past_results.iloc[row, past_results.columns.get_loc("team1")].upper()
-            t2 = past_results.iloc[row, past_results.columns.get_loc("team2")].upper()
-            s1 = past_results.iloc[row, past_results.columns.get_loc("score1")]
-            s2 = past_results.iloc[row, past_results.columns.get_loc("score2")]
-            result = Result.T1WIN if s1 > s2 else Result.T1LOSS if s2 > s1 else Result.TIE
-            self.add_result(t1, t2, result)
-
-        # Copy the teams dict to be re-used as template for each epoch
-        self.orig_teams = self.teams.copy()
+        if past_results is not None:
+            self.ingest(self.team_ids(past_results["team1"]), self.team_ids(past_results["team2"]),
+                        past_results["score1"].to_numpy(), past_results["score2"].to_numpy())
+
+        self.freeze()
+    def copy(self):
+        # a new Standings starting from this one's baseline and elos, without
+        # re-reading past results
+        other = Standings(self.league_info, None)
+        np.copyto(other.wins, self.base_wins)
+        np.copyto(other.losses, self.base_losses)
+        np.copyto(other.ties, self.base_ties)
+        np.copyto(other.h2h, self.base_h2h)
+        np.copyto(other.played, self.base_played)
+        other.set_elos(list(self.elos))
+        other.freeze()
+        return other
+    def team_ids(self, abbs):
+        # team ids of a column of abbreviations
+        return abbs.str.upper().map(self.ids).to_numpy(dtype=np.intp)
+    def ingest(self, t1, t2, score1, score2):
+        # bulk add of played games from team id and score arrays, the same as
+        # add_result per game (a missing score counts as a tie)
+        n = self.wins.shape[0]
+        won1 = score1 > score2
+        won2 = score2 > score1
+        tied = ~(won1 | won2)
+        winners = np.concatenate([t1[won1], t2[won2]])
+        losers = np.concatenate([t2[won1], t1[won2]])
+        self.wins += np.bincount(winners, minlength=n).astype(self.wins.dtype)
+        self.losses += np.bincount(losers, minlength=n).astype(self.losses.dtype)
+        self.ties += np.bincount(np.concatenate([t1[tied], t2[tied]]), minlength=n).astype(self.ties.dtype)
+        self.h2h += np.bincount(winners * n + losers, minlength=n * n).reshape(n, n).astype(self.h2h.dtype)
+        pairs = np.concatenate([t1 * n + t2, t2 * n + t1])
+        self.played += np.bincount(pairs, minlength=n * n).reshape(n, n).astype(self.played.dtype)
+        self._wlt = None
+    def freeze(self):
+        # Snapshot the records after past_results as the baseline every epoch
+        # starts from. The buffers are allocated once here and reset() copies
+        # into the live arrays in place, so an epoch allocates nothing
+        self.base_wins = self.wins.copy()
+        self.base_losses = self.losses.copy()
+        self.base_ties = self.ties.copy()
+        self.base_h2h = self.h2h.copy()
+        self.base_played = self.played.copy()
     def add_result(self, t1abbr, t2abbr, result):
-        game = Game(t1abbr, t2abbr, result)
-        self.teams[t1abbr].add_game(game)
-        self.teams[t2abbr].add_game(game)
+        i = self.ids[t1abbr]
+        j = self.ids[t2abbr]
+        if result == Result.T1WIN:
+            self.wins[i] += 1
+            self.losses[j] += 1
+            self.h2h[i, j] += 1
+        elif result == Result.T1LOSS:
+            self.wins[j] += 1
+            self.losses[i] += 1
+            self.h2h[j, i] += 1
+        else:
+            self.ties[i] += 1
+            self.ties[j] += 1
+        self.played[i, j] += 1
+        self.played[j, i] += 1
+        self._wlt = None
+    def add_results(self, t1, t2, t1_won, played):
+        # bulk add of simulated (tie-free) games from team id arrays
+        n = self.wins.shape[0]
+        winners = np.where(t1_won, t1, t2)
+        losers = np.where(t1_won, t2, t1)
+        self.wins += np.bincount(winners, minlength=n)
+        self.losses += np.bincount(losers, minlength=n)
+        self.h2h += np.bincount(winners * n + losers, minlength=n * n).reshape(n, n)
+        self.played += played
+        self._wlt = None
+    def wlt(self):
+        # win-loss-tie percentage of every team, cached until the next result
+        if self._wlt is None:
+            games = self.wins + self.losses + self.ties
+            self._wlt = ((self.wins + 0.5 * self.ties) / np.maximum(games, 1)).tolist()
+        return self._wlt
+    def record_vs(self, team_id, opps):
+        # wins (ties count half) of team_id against opps, an id list or mask
+        wins = self.h2h[team_id, opps].sum()
+        ties = self.played[team_id, opps].sum() - wins - self.h2h[opps, team_id].sum()
+        return wins + 0.5 * ties
+    def opponents(self, team_id):
+        # boolean mask of every team that team_id has played
+        return self.played[team_id] > 0
     def update_elo(self, abb, elo):
-        self.teams[abb].playoff_elo = elo
+        self.elos[self.ids[abb]] = elo
+        self._win_matrix = None
+    def set_elos(self, elos):
+        self.elos = elos
+        self._win_matrix = None
+    def win_matrix(self):
+        # team x team chance of winning a game on the current elos, rebuilt
+        # only after an elo changes. Rows hold the same values as a nested list
+        # for scalar lookups
+        if self._win_matrix is None:
+            matrix = win_matrix(self.elos)
+            self._win_matrix = (matrix, matrix.tolist())
+        return self._win_matrix[0]
+    def win_prob(self, team1_id, team2_id):
+        self.win_matrix()
+        return self._win_matrix[1][team1_id][team2_id]
     def reset(self):
-        self.teams = self.orig_teams.copy()
+        np.copyto(self.wins, self.base_wins)
+        np.copyto(self.losses, self.base_losses)
+        np.copyto(self.ties, self.base_ties)
+        np.copyto(self.h2h, self.base_h2h)
+        np.copyto(self.played, self.base_played)
+        self._wlt = None
 
     # def __repr__(self):
     #     s = ""
@@ -155,41 +263,238 @@ class Standings:
     #     return s 
 
 class PlayoffResults:
-    def __init__(self):
-        self.teams_to_sbs = dict()
+    # Outcome counts in arrays indexed by team id, added a chunk of epochs at
+    # a time with bincounts:
+    # seeds[t, s] - epochs team t was seed s + 1, s = 7 when it missed the playoffs
+    # rounds[t, r] - epochs t reached round_names[r] (the last is winning the
+    #   Super Bowl), float so playoffs="exact" can add probabilities
+    # win_totals[t, w] - epochs t won w regular season games
+    # Weighted results (from scenarios) count weights instead of epochs, so
+    # every array is float64 there
+    def __init__(self, names, pair_size=1, weighted=False):
+        self.names = list(names)
+        n = len(self.names)
+        dtype = np.float64 if weighted else np.int64
+        self.seeds = np.zeros((n, 8), dtype=dtype)
+        self.rounds = np.zeros((n, len(round_names)), dtype=np.float64)
+        self.win_totals = np.zeros((n, 18), dtype=dtype)
         self.epochs = 0
-    def add_result(self, sb_winner):
-        if sb_winner.name not in self.teams_to_sbs:
-            self.teams_to_sbs[sb_winner.name] = 1
+        # epochs per independent sample, 2 when epochs come in antithetic pairs.
+        # The squared per-sample frequencies give each team's standard error
+        self.pair_size = pair_size
+        self.sbs_sq = np.zeros(n, dtype=np.float64)
+        self.playoffs_sq = np.zeros(n, dtype=np.float64)
+        # sum of the squared weights of weighted results, for their effective sample size
+        self.weighted = weighted
+        self.weights_sq = 0.0
+        # per team clinch marks (Clinches.status) when known
+        self.status = None
+        # a simstats.SimStats for runs with stats=True
+        self.stats = None
+        self.frozen = False
+    def snapshot(self):
+        # read-only copy of the results so far, safe to hand to other code
+        # while this one keeps counting
+        copy = PlayoffResults(self.names, self.pair_size, self.weighted)
+        for attr in ("seeds", "rounds", "win_totals", "sbs_sq", "playoffs_sq"):
+            setattr(copy, attr, getattr(self, attr).copy())
+        copy.epochs = self.epochs
+        copy.weights_sq = self.weights_sq
+        copy.status = self.status
+        copy.stats = None if self.stats is None else self.stats.copy()
+        copy.frozen = True
+        return copy
+    def add_chunk(self, afc, nfc, reached, wins, weights=None):
+        # adds a chunk of epochs (whole antithetic pairs): afc / nfc are the
+        # epochs x 7 seeded team ids, reached the epochs x 14 x round_names
+        # chance each of the afc then nfc seeds reached each round (0 / 1 when
+        # sampled) and wins the epochs x teams regular season win totals.
+        # weights (weighted results only) counts each epoch that many times,
+        # their total taking the place of the epoch count
+        if self.frozen:
+            raise TypeError("results snapshots are read-only")
+        if (weights is not None) != self.weighted:
+            raise ValueError("weights go with weighted results only")
+        epochs = len(afc)
+        if epochs % self.pair_size:
+            raise ValueError("a chunk must hold whole pairs of epochs")
+        if weights is None:
+            total = epochs
+            seed_weights = epoch_weights = None
         else:
-            self.teams_to_sbs[sb_winner.name] += 1
-        self.epochs += 1
+            if self.pair_size != 1:
+                raise ValueError("weighted results can't be paired")
+            total = weights.sum()
+            self.weights_sq += (weights ** 2).sum()
+            seed_weights = np.repeat(weights, 14)
+        n = len(self.names)
+        ids = np.concatenate([afc, nfc], axis=1)
+        seed_index = np.tile(np.arange(7), 2)
+        self.seeds[:, :7] += np.bincount((ids * 8 + seed_index).ravel(), seed_weights, minlength=n * 8).reshape(n, 8)[:, :7]
+        self.seeds[:, 7] = self.epochs + total - self.seeds[:, :7].sum(axis=1)
+        flat = ids.ravel()
+        for r in range(len(round_names)):
+            values = reached[:, :, r].ravel()
+            self.rounds[:, r] += np.bincount(flat, values if seed_weights is None else values * seed_weights, minlength=n)
+        cols = max(int(wins.max()) + 1, self.win_totals.shape[1])
+        if cols > self.win_totals.shape[1]:
+            self.win_totals = np.pad(self.win_totals, ((0, 0), (0, cols - self.win_totals.shape[1])))
+        win_weights = None if weights is None else np.repeat(weights, n)
+        self.win_totals += np.bincount((np.arange(n) * cols + wins).ravel(), win_weights, minlength=n * cols).reshape(n, cols)
+        # per-sample frequencies for the standard errors
+        rows = np.arange(epochs)[:, None]
+        sbs = np.zeros((epochs, n))
+        sbs[rows, ids] = reached[:, :, -1]
+        made = np.zeros((epochs, n))
+        made[rows, ids] = 1
+        if weights is None:
+            self.sbs_sq += (sbs.reshape(-1, self.pair_size, n).mean(axis=1) ** 2).sum(axis=0)
+            self.playoffs_sq += (made.reshape(-1, self.pair_size, n).mean(axis=1) ** 2).sum(axis=0)
+        else:
+            self.sbs_sq += weights @ sbs ** 2
+            self.playoffs_sq += weights @ made
+        self.epochs += total
+    def merge(self, other):
+        # adds the counts of another run (e.g. a worker's shard) into this one
+        if self.frozen:
+            raise TypeError("results snapshots are read-only")
+        if other.pair_size != self.pair_size:
+            raise ValueError("can't merge results with different pair sizes")
+        if self.weighted or other.weighted:
+            raise ValueError("can't merge weighted results")
+        cols = max(self.win_totals.shape[1], other.win_totals.shape[1])
+        self.win_totals = np.pad(self.win_totals, ((0, 0), (0, cols - self.win_totals.shape[1])))
+        self.win_totals[:, :other.win_totals.shape[1]] += other.win_totals
+        self.seeds += other.seeds
+        self.rounds += other.rounds
+        self.sbs_sq += other.sbs_sq
+        self.playoffs_sq += other.playoffs_sq
+        self.epochs += other.epochs
+        if self.stats is not None and other.stats is not None:
+            self.stats.merge(other.stats)
+        return self
+    @property
+    def sb_wins(self):
+        return self.rounds[:, -1]
+    @property
+    def playoff_counts(self):
+        return self.seeds[:, :7].sum(axis=1)
+    @property
+    def division_titles(self):
+        # division winners are seeds 1-4
+        return self.seeds[:, :4].sum(axis=1)
+    @property
+    def teams_to_sbs(self):
+        # Super Bowl wins by team name, of the teams that won any
+        return {self.names[i]: self.sb_wins[i].item() for i in np.flatnonzero(self.sb_wins)}
+    @property
+    def teams_to_playoffs(self):
+        counts = self.playoff_counts
+        return {self.names[i]: counts[i].item() for i in np.flatnonzero(counts)}
+    def samples(self):
+        # independent samples behind the results, the effective sample size
+        # (sum of weights)^2 / (sum of squared weights) when weighted
+        if self.weighted:
+            return self.epochs ** 2 / self.weights_sq if self.weights_sq else 0.0
+        return self.epochs // self.pair_size
+    def standard_errors(self):
+        # standard error of each team's Super Bowl and playoff probability
+        sb = self._std_errors(self.sb_wins, self.sbs_sq).tolist()
+        playoffs = self._std_errors(self.playoff_counts, self.playoffs_sq).tolist()
+        return {name: {"sb": sb[i], "playoffs": playoffs[i]} for i, name in enumerate(self.names)}
+    def max_std_error(self):
+        # worst standard error over every team's Super Bowl and playoff odds
+        errors = np.concatenate([self._std_errors(self.sb_wins, self.sbs_sq),
+                                 self._std_errors(self.playoff_counts, self.playoffs_sq)])
+        if np.isnan(errors).any():
+            return float("inf")
+        return errors.max().item()
+    def _std_errors(self, counts, sq):
+        samples = self.samples()
+        if samples < 2:
+            return np.full(len(self.names), np.nan)
+        p = counts / self.epochs
+        # mean of the squared per-sample frequencies: sq holds their sum, or
+        # their weighted sum over a total weight of epochs when weighted
+        mean_sq = sq / self.epochs if self.weighted else sq / samples
+        var = np.maximum(mean_sq - p * p, 0) * samples / (samples - 1)
+        return np.sqrt(var / samples)
     def table_repr(self):
+        # one row per team, most Super Bowl wins first. Percentages are of
+        # epochs, *_percentages lists are seeds 1-7 then out and 0, 1, ... wins
         table = []
-        sorted_teams = sorted(self.teams_to_sbs.items(), key=lambda x: x[1], reverse=True)
-        for t in sorted_teams:
+        errors = self.standard_errors()
+        pct = 100 / max(self.epochs, 1)
+        playoffs = self.playoff_counts
+        divisions = self.division_titles
+        mean_wins = (self.win_totals @ np.arange(self.win_totals.shape[1])) / max(self.epochs, 1)
+        order = sorted(range(len(self.names)), key=lambda i: (self.sb_wins[i], playoffs[i], mean_wins[i]), reverse=True)
+        for i in order:
+            t = self.names[i]
             row = {}
-            row["team_name"] = t[0]
-            row["win_percentage"] = round(t[1] / self.epochs * 100, 2)
-            row["num_wins"] = t[1]
+            row["team_name"] = t
+            row["status"] = self.status[i] if self.status else ""
+            row["win_percentage"] = round(self.sb_wins[i].item() * pct, 2)
+            row["win_std_error"] = round(errors[t]["sb"] * 100, 2)
+            row["num_wins"] = round(self.sb_wins[i].item(), 1)
+            row["playoff_percentage"] = round(playoffs[i].item() * pct, 2)
+            row["playoff_std_error"] = round(errors[t]["playoffs"] * 100, 2)
+            row["division_percentage"] = round(divisions[i].item() * pct, 2)
+            for r, name in enumerate(round_names[:-1]):
+                row[name + "_percentage"] = round(self.rounds[i, r].item() * pct, 2)
+            row["seed_percentages"] = [round(c * pct, 2) for c in self.seeds[i].tolist()]
+            row["win_total_percentages"] = [round(c * pct, 2) for c in self.win_totals[i].tolist()]
+            row["mean_wins"] = round(mean_wins[i].item(), 2)
             table.append(row)
         return table
     def __repr__(self):
         out = ""
+        errors = self.standard_errors()
         sorted_teams = sorted(self.teams_to_sbs.items(), key=lambda x: x[1], reverse=True)
         for t in sorted_teams:
             win_pct = t[1] / self.epochs
-            out += t[0] + ": " + "{:.2%}".format(win_pct) + " (" + str(t[1]) + " SB wins)\n"
+            out += t[0] + ": " + "{:.2%}".format(win_pct) + " ± " + "{:.2%}".format(errors[t[0]]["sb"]) + " (" + str(round(t[1], 1)) + " SB wins)\n"
         return out  
 
-def sim_game(team1, team2):
+class PresetDraws:
+    # Stands in for a random.Random, handing out pre-drawn uniforms in order
+    __slots__ = ("values", "i")
+    def __init__(self, values):
+        self.values = values
+        self.i = -1
+    def random(self):
+        self.i += 1
+        return self.values[self.i]
+
+def draw_uniforms(rng, epochs, size, antithetic=False):
+    # epochs x size uniforms, with antithetic rows 2i / 2i + 1 drawn as u / 1 - u
+    if not antithetic:
+        return rng.random((epochs, size))
+    u = rng.random(((epochs + 1) // 2, size))
+    return np.stack([u, 1 - u], axis=1).reshape(-1, size)[:epochs]
+
+def win_matrix(elos):
+    # [i, j] is the chance a team rated elos[i] beats one rated elos[j].
+    # An epochs x teams elos gives one matrix per epoch
+    elos = np.asarray(elos, dtype=float)
+    return 1 / (10 ** (-(elos[..., :, None] - elos[..., None, :]) / 400) + 1)
+
+def sim_game(team1, team2, rng=random):
     # simulates a game result using elo ratings
     # doesn't allow ties
-    # TODO: Make this more sophisticated using 538 methodology
-    # Update ELO's after every game, make adjustments
-    elo_diff = team1.playoff_elo - team2.playoff_elo
-    prob1 = 1 / (10 ** (-elo_diff / 400) + 1)
-    return team1 if random.random() <= prob1 else team2
+    # elo_mode="dynamic" in sim_season updates elos after every game (538 methodology)
+    prob1 = team1.standings.win_prob(team1.id, team2.id)
+    return team1 if rng.random() <= prob1 else team2
+
+def sim_games(win, team1, team2, draws):
+    # sim_game over arrays of team ids, returns the winners' ids. win is a
+    # win_matrix, or one per epoch with team1 / team2 indexed by epoch
+    if win.ndim == 2:
+        prob1 = win[team1, team2]
+    else:
+        rows = np.arange(len(team1)).reshape((-1,) + (1,) * (team1.ndim - 1))
+        prob1 = win[rows, team1, team2]
+    return np.where(draws <= prob1, team1, team2)
 
 def update_row_elo(standings, team1, team2, elo1_pre, elo2_pre):
     standings.update_elo(team1, elo1_pre)
@@ -197,145 +502,509 @@ def update_row_elo(standings, team1, team2, elo1_pre, elo2_pre):
 
 def get_last_elos(standings, past_results):
     # get elo's from last week of past_results
-    last_date = past_results[past_results.playoff.isna()].tail(1).dateObject.iloc[0]
-    last_date_minus1 = last_date - pd.Timedelta(days=1)
-    last_week = past_results[(past_results.dateObject == last_date) | (past_results.dateObject == last_date_minus1)]
-
-    for row in range(last_week.shape[0]):
-        team1 = last_week.iloc[row, last_week.columns.get_loc("team1")]
-        team2 = last_week.iloc[row, last_week.columns.get_loc("team2")]
-        standings.update_elo(team1, last_week.iloc[row, last_week.columns.get_loc("elo1_pre")])
-        standings.update_elo(team2, last_week.iloc[row, last_week.columns.get_loc("elo2_pre")])
-    # last_week.apply(lambda row: update_row_elo(standings, row.team1, row.team2, row.elo1_pre, row.elo2_pre), axis=1)
-
-def sim_reg_game(standings, team1, team2, elo_prob1, elo_pre1, elo_pre2):
-    rand = random.random() # TODO: maybe generate rands vectorized at start?
+    dates = past_results["dateObject"].to_numpy()
+    last_date = dates[past_results["playoff"].isna().to_numpy()][-1]
+    last_date_minus1 = last_date - np.timedelta64(1, "D")
+    last_week = past_results[(dates == last_date) | (dates == last_date_minus1)]
+
+    # interleave each game's two teams so later games win, as updating row by row did
+    ids = np.column_stack([standings.team_ids(last_week["team1"]), standings.team_ids(last_week["team2"])]).ravel()
+    elos = np.column_stack([last_week["elo1_pre"].to_numpy(), last_week["elo2_pre"].to_numpy()]).ravel()
+    new_elos = list(standings.elos)
+    for i, elo in zip(ids.tolist(), elos.tolist()):
+        new_elos[i] = elo
+    standings.set_elos(new_elos)
+
+def sim_reg_game(standings, team1, team2, elo_prob1, elo_pre1, elo_pre2, rng=random):
+    rand = rng.random() # TODO: maybe generate rands vectorized at start?
     result = Result.T1WIN if rand <= elo_prob1 else Result.T1LOSS
     standings.update_elo(team1, elo_pre1)
     standings.update_elo(team2, elo_pre2)
     standings.add_result(team1, team2, result)
 
-def sim_season(year, start_date, epochs):
-    # Simulates a season and returns the playoff results
-    league_info = LeagueInfo(info_file)
-    season = datetime(year=year, month=9, day=1)
+class Schedule:
+    # Flat array form of rem_games, built once per run so every epoch
+    # can be simulated without touching pandas
+    def __init__(self, league_info, rem_games, season_games=None):
+        self.t1abbs = [abb.upper() for abb in rem_games["team1"]]
+        self.t2abbs = [abb.upper() for abb in rem_games["team2"]]
+        self.t1 = np.array([league_info.ids[abb] for abb in self.t1abbs], dtype=np.intp)
+        self.t2 = np.array([league_info.ids[abb] for abb in self.t2abbs], dtype=np.intp)
+        self.elo_prob1 = rem_games["elo_prob1"].to_numpy(dtype=np.float64)
+        self.elo1_pre = rem_games["elo1_pre"].to_numpy(dtype=np.float64)
+        self.elo2_pre = rem_games["elo2_pre"].to_numpy(dtype=np.float64)
+        self.num_games = len(self.t1abbs)
+        # games between each pair, added to Standings.played every epoch
+        n = len(league_info.abbs)
+        self.played = np.zeros((n, n), dtype=np.int8)
+        np.add.at(self.played, (self.t1, self.t2), 1)
+        np.add.at(self.played, (self.t2, self.t1), 1)
+        # position of each game in the whole regular season, so common random
+        # numbers give a game the same draw whatever the start date
+        if season_games is None:
+            season_games = rem_games
+        self.season_index = season_games.index.get_indexer(rem_games.index)
+        self.season_games = season_games.shape[0]
+        # for dynamic elos: home field per game and the games split into weeks,
+        # each a run of games where no team plays twice
+        self.home_field = home_field * (1 - rem_games["neutral"].to_numpy(dtype=np.float64))
+        self.weeks = []
+        week, teams = [], set()
+        for g, (t1, t2) in enumerate(zip(self.t1.tolist(), self.t2.tolist())):
+            if t1 in teams or t2 in teams:
+                self.weeks.append(np.array(week, dtype=np.intp))
+                week, teams = [], set()
+            week.append(g)
+            teams.update((t1, t2))
+        if week:
+            self.weeks.append(np.array(week, dtype=np.intp))
+        # per game 1 / 0 when pinned to a team1 win / loss, -1 otherwise
+        self.forced = None
+    def pinned(self, pins):
+        # a copy where each game in pins (index -> True / False for a team1
+        # win / loss, or team1's chance of winning) has that result or odds.
+        # Odds only apply to static elos, dynamic ones work out their own
+        other = copy.copy(self)
+        other.elo_prob1 = self.elo_prob1.copy()
+        other.forced = np.full(self.num_games, -1, dtype=np.int8) if self.forced is None else self.forced.copy()
+        for game, pin in pins.items():
+            if isinstance(pin, (bool, np.bool_)):
+                other.forced[game] = int(pin)
+            else:
+                other.elo_prob1[game] = pin
+        return other
+    def force(self, outcomes, games=slice(None)):
+        # outcomes (epochs x games) with the pinned results of games put in
+        if self.forced is None:
+            return outcomes
+        forced = self.forced[games]
+        return np.where(forced < 0, outcomes, forced == 1)
+    def win_totals(self, outcomes, base_wins):
+        # epochs x teams regular season wins: base_wins plus each epoch's
+        # simulated wins, one bincount over (epoch, winner)
+        epochs, n = outcomes.shape[0], len(base_wins)
+        winners = np.where(outcomes, self.t1, self.t2) + n * np.arange(epochs)[:, None]
+        return base_wins + np.bincount(winners.ravel(), minlength=epochs * n).reshape(epochs, n)
+    def draw(self, epochs, rng, antithetic=False, crn=False):
+        # one uniform per (epoch, game)
+        if crn:
+            return draw_uniforms(rng, epochs, self.season_games, antithetic)[:, self.season_index]
+        return draw_uniforms(rng, epochs, self.num_games, antithetic)
+    def sim_outcomes(self, epochs, rng, antithetic=False, crn=False):
+        # True where team1 won
+        return self.force(self.draw(epochs, rng, antithetic, crn) <= self.elo_prob1)
+    def sim_outcomes_dynamic(self, epochs, rng, elos, antithetic=False, crn=False):
+        # sim_outcomes with 538 elo updates after every game. elos holds each
+        # team's rating going into the remaining games; returns the outcomes
+        # and the epochs x teams ratings after the regular season.
+        # The margin comes from the same draw as the result: u <= p exactly
+        # when diff + 400 * log10((1 - u) / u) >= 0, a logistic score
+        # difference (sd ~12.6 points at 25 elo per point) around the spread
+        u = self.draw(epochs, rng, antithetic, crn)
+        ratings = np.tile(np.asarray(elos, dtype=np.float64), (epochs, 1))
+        outcomes = np.empty(u.shape, dtype=bool)
+        latent = 400 * np.log10((1 - u) / np.maximum(u, 1e-300))
+        for week in self.weeks:
+            t1, t2 = self.t1[week], self.t2[week]
+            diff = ratings[:, t1] - ratings[:, t2] + self.home_field[week]
+            prob1 = 1 / (10 ** (-diff / 400) + 1)
+            won = self.force(u[:, week] <= prob1, week)
+            outcomes[:, week] = won
+            margin = np.maximum(np.rint(np.abs(diff + latent[:, week]) / 25), 1)
+            winner_diff = np.where(won, diff, -diff)
+            shift = elo_k * np.log(margin + 1) * 2.2 / (winner_diff * 0.001 + 2.2) * (won - prob1)
+            ratings[:, t1] += shift
+            ratings[:, t2] -= shift
+        return outcomes, ratings
 
-    # start_date = datetime.now() # use today's date to stay current
-    # start_date = datetime.strptime(start_date, "%m-%d-%Y")
-    elo = pd.read_csv(elo_file)
-    elo = elo[elo["playoff"].isna()]
-    elo["dateObject"] = elo["date"].apply((lambda x: datetime.strptime(x, "%Y-%m-%d")))
+def get_final_elos(past_results, rem_games):
+    # elo_pre of each team's last scheduled game, which is what the
+    # reference path leaves in playoff_elo after simming the season
+    games = pd.concat([past_results, rem_games])
+    elos = {}
+    for t1, t2, e1, e2 in zip(games["team1"], games["team2"], games["elo1_pre"], games["elo2_pre"]):
+        elos[t1.upper()] = e1
+        elos[t2.upper()] = e2
+    return elos
+
+def get_current_elos(past_results, rem_games):
+    # each team's rating going into rem_games: elo_post of its last game
+    # played, or elo_pre of its next game when it has one
+    elos = {}
+    for t1, t2, e1, e2 in zip(past_results["team1"], past_results["team2"], past_results["elo1_post"], past_results["elo2_post"]):
+        elos[t1.upper()] = e1
+        elos[t2.upper()] = e2
+    for t1, t2, e1, e2 in zip(rem_games["team1"][::-1], rem_games["team2"][::-1], rem_games["elo1_pre"][::-1], rem_games["elo2_pre"][::-1]):
+        elos[t1.upper()] = e1
+        elos[t2.upper()] = e2
+    return elos
+
+def sim_playoffs(afc_seeds, nfc_seeds, rng=random):
+    # sims the playoffs from the 7 seeds in each conference, returns the champ
+    for ind, team in enumerate(afc_seeds):
+        team.playoff_seed = ind + 1
+
+    for ind, team in enumerate(nfc_seeds):
+        team.playoff_seed = ind + 1
+
+    # WILD CARD ROUND
+    awc1 = sim_game(afc_seeds[1], afc_seeds[6], rng)
+    awc2 = sim_game(afc_seeds[2], afc_seeds[5], rng)
+    awc3 = sim_game(afc_seeds[3], afc_seeds[4], rng)
+    nwc1 = sim_game(nfc_seeds[1], nfc_seeds[6], rng)
+    nwc2 = sim_game(nfc_seeds[2], nfc_seeds[5], rng)
+    nwc3 = sim_game(nfc_seeds[3], nfc_seeds[4], rng)
+
+    # DIVISIONAL ROUND
+    # reseed with sorting
+    afc_rem = [awc1, awc2, awc3]
+    afc_rem = sorted(afc_rem, key=lambda x: x.playoff_seed)
+    nfc_rem = [nwc1, nwc2, nwc3]
+    nfc_rem = sorted(nfc_rem, key=lambda x: x.playoff_seed)
+
+    adv1 = sim_game(afc_seeds[0], afc_rem[2], rng)
+    adv2 = sim_game(afc_rem[0], afc_rem[1], rng)
+    ndv1 = sim_game(nfc_seeds[0], nfc_rem[2], rng)
+    ndv2 = sim_game(nfc_rem[0], nfc_rem[1], rng)
+
+    # CONFERENCE ROUND
+    acf = sim_game(adv1, adv2, rng)
+    ncf = sim_game(ndv1, ndv2, rng)
+
+    # SUPER BOWL
+    return sim_game(acf, ncf, rng)
+
+def conf_round_odds(win):
+    # exact chance each of the 7 seeds reaches the divisional round, reaches
+    # the conference game and wins the conference, where win[i][j] is seed
+    # i + 1 beating seed j + 1, summing over the 8 wild card outcomes with the
+    # same reseeding as sim_playoffs
+    odds = [[1.0, 0.0, 0.0]] + [[0.0, 0.0, 0.0] for _ in range(6)]
+    for outcome in range(8):
+        p = 1
+        rem = []
+        for game, (a, b) in enumerate(((1, 6), (2, 5), (3, 4))):
+            if outcome >> game & 1:
+                p *= win[a][b]
+                rem.append(a)
+            else:
+                p *= win[b][a]
+                rem.append(b)
+        rem.sort()
+        for a in rem:
+            odds[a][0] += p
+        for a, pa in ((0, win[0][rem[2]]), (rem[2], win[rem[2]][0])):
+            odds[a][1] += p * pa
+            for b, pb in ((rem[0], win[rem[0]][rem[1]]), (rem[1], win[rem[1]][rem[0]])):
+                q = p * pa * pb
+                odds[a][2] += q * win[a][b]
+                odds[b][2] += q * win[b][a]
+        for b, pb in ((rem[0], win[rem[0]][rem[1]]), (rem[1], win[rem[1]][rem[0]])):
+            odds[b][1] += p * pb
+    return odds
+
+def conf_champ_odds(win):
+    # exact chance each of the 7 seeds wins the conference
+    return [seed[2] for seed in conf_round_odds(win)]
+
+def playoff_round_odds(afc_seeds, nfc_seeds, cache=None):
+    # exact chance each of the afc then nfc seeds reaches each of round_names,
+    # a 14 x 4 array. cache maps a conference's (ids, elos) to its conference
+    # odds, which are shared by every epoch with the same seeds
+    matrix = afc_seeds[0].standings.win_matrix()
+    ids = [[team.id for team in seeds] for seeds in (afc_seeds, nfc_seeds)]
+    conf_odds = []
+    for seeds, conf_ids in zip((afc_seeds, nfc_seeds), ids):
+        key = tuple(conf_ids) + tuple(team.playoff_elo for team in seeds)
+        odds = cache.get(key) if cache is not None else None
+        if odds is None:
+            odds = conf_round_odds(matrix[np.ix_(conf_ids, conf_ids)].tolist())
+            if cache is not None:
+                cache[key] = odds
+        conf_odds.append(odds)
+    win = matrix[np.ix_(ids[0], ids[1])].tolist()
+    afc_odds, nfc_odds = ([seed[2] for seed in odds] for odds in conf_odds)
+    sb_odds = [afc_odds[i] * sum(pn * w for pn, w in zip(nfc_odds, win[i])) for i in range(7)]
+    sb_odds += [nfc_odds[j] * sum(pa * (1 - row[j]) for pa, row in zip(afc_odds, win)) for j in range(7)]
+    return np.column_stack([np.array(conf_odds[0] + conf_odds[1]), sb_odds])
+
+def playoff_odds(afc_seeds, nfc_seeds, cache=None):
+    # exact Super Bowl odds of each seeded team, the expectation of sim_playoffs
+    odds = playoff_round_odds(afc_seeds, nfc_seeds, cache)[:, -1].tolist()
+    return {team.name: p for team, p in zip(afc_seeds + nfc_seeds, odds)}
+
+def playoff_games(win, afc, nfc, draws):
+    # sim_playoffs for many epochs at once. afc / nfc are epochs x 7 arrays of
+    # seeded team ids, draws the epochs x 13 uniforms sim_playoffs would take
+    # in order and win the win_matrix (or one per epoch). Returns the winners'
+    # ids of every game, epochs x 13 in the same order: AFC then NFC wild
+    # cards (2v7, 3v6, 4v5), AFC then NFC divisional (1 v lowest seed left
+    # first), AFC and NFC championships, Super Bowl
+    rows = np.arange(len(afc))
+    high, low = np.array([1, 2, 3]), np.array([6, 5, 4])
+    winners = np.empty((len(afc), num_playoff_games), dtype=afc.dtype)
+    for c, seeds in enumerate((afc, nfc)):
+        wild_cards = sim_games(win, seeds[:, high], seeds[:, low], draws[:, 3 * c:3 * c + 3])
+        winners[:, 3 * c:3 * c + 3] = wild_cards
+        # wild card winners as seed positions, sorted to reseed
+        rem = np.sort(np.where(wild_cards == seeds[:, high], high, low), axis=1)
+        div1 = sim_games(win, seeds[:, 0], seeds[rows, rem[:, 2]], draws[:, 6 + 2 * c])
+        div2 = sim_games(win, seeds[rows, rem[:, 0]], seeds[rows, rem[:, 1]], draws[:, 7 + 2 * c])
+        winners[:, 6 + 2 * c] = div1
+        winners[:, 7 + 2 * c] = div2
+        winners[:, 10 + c] = sim_games(win, div1, div2, draws[:, 10 + c])
+    winners[:, 12] = sim_games(win, winners[:, 10], winners[:, 11], draws[:, 12])
+    return winners
+
+def rounds_reached(afc, nfc, winners):
+    # epochs x 14 x round_names booleans of which afc then nfc seeds reached
+    # each round, from playoff_games winners
+    ids = np.concatenate([afc, nfc], axis=1)
+    reached = np.empty(ids.shape + (len(round_names),), dtype=bool)
+    # the 1 seeds get a bye into the divisional round
+    teams = [np.concatenate([afc[:, :1], nfc[:, :1], winners[:, :6]], axis=1), winners[:, 6:10], winners[:, 10:12],
+             winners[:, 12:]]
+    for r, round_teams in enumerate(teams):
+        reached[:, :, r] = (ids[:, :, None] == round_teams[:, None, :]).any(axis=2)
+    return reached
+
+def sim_playoffs_batch(win, afc, nfc, draws, rounds=False):
+    # each epoch's champion id from playoff_games, and with rounds=True also
+    # the rounds_reached of its seeds
+    winners = playoff_games(win, afc, nfc, draws)
+    if not rounds:
+        return winners[:, 12]
+    return winners[:, 12], rounds_reached(afc, nfc, winners)
+
+def load_elo(elo_file):
+    # regular season rows of elo_file, read from its memory-mapped columnar
+    # store (built on first use and whenever the csv changes)
+    return elo_store.load(elo_file).frame()
+
+def split_season(elo, year, start_date):
+    # games of year played before start_date, those left to play, and all of them
+    season = datetime(year=year, month=9, day=1)
     past_results = elo[(elo["dateObject"] < start_date) & (elo["dateObject"] >= season)]
-    rem_games = elo[elo["dateObject"] >= start_date]
+    rem_games = elo[(elo["dateObject"] >= start_date) & (elo["season"] == year)]
+    season_games = elo[elo["season"] == year]
+    return past_results, rem_games, season_games
 
-    # encoded_auth = "Basic " + base64.b64encode('{}:{}'.format(key,"MYSPORTSFEEDS").encode('utf-8')).decode('ascii')
-    # r = requests.get(standings_url, headers={"Authorization": encoded_auth})
-    # info = r.json()["teams"]
-    
-    tiebreakers = Tiebreakers(league_info.team_info)
+def load_win_matrix(year, start_date, elo_file=elo_file, season=None):
+    # the playoff win matrix sim_season would use for year from start_date,
+    # with the team abbreviations of its rows, without simulating anything
+    if season is None:
+        season = Season(year, start_date, elo_file)
+    return season.league_info.abbs, win_matrix(season.final_elos)
 
-    # 1. Standings contain info from API for already-played games
-    # 2. Get remaining game info from elo rankings CSV
-    # 3. Simulate remaining games acc. to elo rankings
-    # 4. Get playoff seedings
-    # 5. Simulate playoffs and get Super Bowl champion
-    # 6. Repeat many times to get probabilities of playoffs and super bowl
+class Season:
+    # Everything a run reads for year from start_date that no run changes:
+    # the league, past / remaining games, baseline standings, schedule arrays
+    # and elos. Built once and shared read-only, each run takes its own
+    # Standings from standings()
+    def __init__(self, year, start_date, elo_file=elo_file, info_file=info_file):
+        self.year = year
+        self.start_date = start_date
+        self.league_info = LeagueInfo(info_file)
+        self.past_results, self.rem_games, self.season_games = split_season(load_elo(elo_file), year, start_date)
+        self.baseline = Standings(self.league_info, self.past_results)
+        self.schedule = Schedule(self.league_info, self.rem_games, self.season_games)
+        final_elos = get_final_elos(self.past_results, self.rem_games)
+        current_elos = get_current_elos(self.past_results, self.rem_games)
+        self.final_elos = [final_elos.get(abb, 0) for abb in self.league_info.abbs]
+        self.start_elos = [current_elos.get(abb, 0) for abb in self.league_info.abbs]
+        # what the remaining games can't change any more. A pinned copy keeps
+        # these, which still hold with fewer open games
+        self.clinches = Clinches(self.baseline, self.schedule)
+    def standings(self):
+        return self.baseline.copy()
+    def pinned(self, pins):
+        # this season with the remaining games in pins decided, see Schedule.pinned
+        other = copy.copy(self)
+        other.schedule = self.schedule.pinned(pins)
+        return other
 
-    results = PlayoffResults()
-    standings = Standings(league_info, past_results)
-
-    for i in range(epochs):
-        if i % 100 == 0:
-            print(str(i) + "/" + str(num_epochs))
-
-        # for each row, updates elo's, gathers probs and team abbrevations,
-        # sims the game, and logs the result - how to vectorize?
-
-        # TODO: this is the bottleneck
-        # Getting: team1, team2, elo_prob1, elo1_pre, elo2_pre
-        # # Sim remaining games
-        # for index, row in rem_games.iterrows():
-        #     team1 = row.team1
-        #     team2 = row.team2
-        #     prob = row.elo_prob1 # prob that team1 wins
-        #     standings.update_elo(team1, row.elo1_pre)
-        #     standings.update_elo(team2, row.elo2_pre)
-        #     rand = random.random()
-        #     result = Result.T1WIN if rand <= prob else Result.T1LOSS
-        #     standings.add_result(team1, team2, result)
-        rem_games.apply(lambda row: sim_reg_game(standings, row.team1, row.team2, row.elo_prob1, row.elo1_pre, row.elo2_pre), axis=1)
-
-        if rem_games.empty:
-            get_last_elos(standings, past_results)
-
-        # if i % 100 == 0:
-        #     print(standings)
-        # Determine seedings
-        # TODO: look into tiebreaker efficiency a bit (maybe no improvement)
-        afc_seeds, nfc_seeds = tiebreakers.get_playoff_seeds(standings)
-        # print(afc_seeds)
-        # print(nfc_seeds)
-        for ind, team in enumerate(afc_seeds):
-            team.playoff_seed = ind + 1
-
-        for ind, team in enumerate(nfc_seeds):
-            team.playoff_seed = ind + 1
-
-        # TODO: This is all pretty fast
-        # sim the playoffs
-        # WILD CARD ROUND
-        awc1 = sim_game(afc_seeds[1], afc_seeds[6])
-        awc2 = sim_game(afc_seeds[2], afc_seeds[5])
-        awc3 = sim_game(afc_seeds[3], afc_seeds[4])
-        nwc1 = sim_game(nfc_seeds[1], nfc_seeds[6])
-        nwc2 = sim_game(nfc_seeds[2], nfc_seeds[5])
-        nwc3 = sim_game(nfc_seeds[3], nfc_seeds[4])
-
-        # DIVISIONAL ROUND
-        # reseed with sorting
-        afc_rem = [awc1, awc2, awc3]
-        afc_rem = sorted(afc_rem, key=lambda x: x.playoff_seed)
-        nfc_rem = [nwc1, nwc2, nwc3]
-        nfc_rem = sorted(nfc_rem, key=lambda x: x.playoff_seed)
-
-        adv1 = sim_game(afc_seeds[0], afc_rem[2])
-        adv2 = sim_game(afc_rem[0], afc_rem[1])
-        ndv1 = sim_game(nfc_seeds[0], nfc_rem[2])
-        ndv2 = sim_game(nfc_rem[0], nfc_rem[1])
-
-        # CONFERENCE ROUND
-        acf = sim_game(adv1, adv2)
-        ncf = sim_game(ndv1, ndv2)
-        
-        # SUPER BOWL
-        sb = sim_game(acf, ncf)
-        #print("Super bowl champ: " + str(sb))
+class SeasonCache:
+    # Thread-safe LRU of Seasons keyed by (year, start_date), so a server only
+    # pays for the epochs of a request. Every entry is dropped when the elo or
+    # team info file changes on disk
+    def __init__(self, maxsize=16, elo_file=elo_file, info_file=info_file):
+        self.maxsize = maxsize
+        self.elo_file = elo_file
+        self.info_file = info_file
+        self.lock = threading.Lock()
+        self.seasons = OrderedDict()
+        self.stamp = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    def file_stamp(self):
+        stamp = []
+        for path in (self.elo_file, self.info_file):
+            stat = os.stat(path)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+    def get(self, year, start_date):
+        stamp = self.file_stamp()
+        key = (year, start_date)
+        with self.lock:
+            if stamp != self.stamp:
+                if self.seasons:
+                    self.invalidations += 1
+                self.seasons.clear()
+                self.stamp = stamp
+            season = self.seasons.get(key)
+            if season is not None:
+                self.seasons.move_to_end(key)
+                self.hits += 1
+                return season
+            self.misses += 1
+        # built outside the lock so other keys aren't held up. When several
+        # threads miss the same key they all get the first one stored
+        season = Season(year, start_date, self.elo_file, self.info_file)
+        with self.lock:
+            if stamp == self.stamp:
+                season = self.seasons.setdefault(key, season)
+                if len(self.seasons) > self.maxsize:
+                    self.seasons.popitem(last=False)
+        return season
+    def cache_info(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "maxsize": self.maxsize, "currsize": len(self.seasons),
+                    "hit_rate": self.hits / lookups if lookups else 0.0, "invalidations": self.invalidations}
+
+def sim_season(year, start_date, epochs, engine="vectorized", seed=None, chunk_size=1000, workers=1,
+               sampling="iid", crn=False, target_se=None, min_epochs=min_epochs, playoffs="sampled",
+               elo_mode="static", season=None, progress=None, bank=None, stats=False, elo_file=elo_file):
+    # Simulates a season and returns the playoff results
+    # engine="vectorized" draws every epoch's regular season outcomes in one
+    # numpy call per chunk, engine="reference" is the original per-row path.
+    # Epochs are split into one shard per worker, each with its own random
+    # stream spawned from seed, so a (seed, workers) pair always reproduces
+    # the same results.
+    # sampling="antithetic" runs epochs in pairs whose game and playoff draws
+    # are u and 1 - u (epochs is rounded up to even). crn=True draws every
+    # regular season game of the year so a game keeps its draw across runs
+    # with the same seed / workers but different start dates or elos.
+    # With target_se, epochs is only a cap: each shard stops after the first
+    # chunk (past min_epochs) where every team's SB and playoff standard error
+    # is below target_se * sqrt(workers), so the merged shards meet target_se.
+    # playoffs="exact" adds each epoch's exact Super Bowl odds given its seeds
+    # (playoff_odds) instead of one sampled champion, removing playoff noise.
+    # elo_mode="dynamic" updates every epoch's ratings after each simulated
+    # game the way 538 does (K-factor, margin of victory, home field), so
+    # upsets carry into later games and the playoffs.
+    # season is a prebuilt Season for year / start_date (e.g. from a
+    # SeasonCache), otherwise every shard loads its own.
+    # progress(results, epochs) is called with the results so far after every
+    # chunk, which needs workers=1 (print_progress prints the epochs done).
+    # iter_season is the same run as a generator of snapshots.
+    # bank (a scenarios.SampleBank or archive.ArchiveWriter) is handed every
+    # chunk's outcomes, seeds, rounds reached, win totals and playoff_games
+    # winners through bank.add, which needs workers=1.
+    # stats=True times each phase of the run and counts the tiebreakers it
+    # goes through into results.stats (a simstats.SimStats), summed over workers
+    if progress is not None and workers != 1:
+        raise ValueError("progress needs workers=1")
+    if bank is not None and workers != 1:
+        raise ValueError("bank needs workers=1")
+    pair_size = check_options(sampling, playoffs, elo_mode)
+    pairs = -(-epochs // pair_size)
+    shard_seeds = np.random.SeedSequence(seed).spawn(workers)
+    shard_epochs = [pair_size * (pairs // workers + (1 if i < pairs % workers else 0)) for i in range(workers)]
+    shard_se = None if target_se is None else target_se * workers ** 0.5
+    shard_min = -(-min_epochs // workers)
+    if workers == 1:
+        results = sim_shard(year, start_date, shard_epochs[0], shard_seeds[0], engine, chunk_size, sampling, crn,
+                            shard_se, shard_min, playoffs, elo_mode, season, progress, elo_file, bank, stats)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(sim_shard, year, start_date, n, shard_seed, engine, chunk_size, sampling, crn,
+                                   shard_se, shard_min, playoffs, elo_mode, season, None, elo_file, None, stats)
+                       for n, shard_seed in zip(shard_epochs, shard_seeds)]
+            # merge in shard order so the counts are independent of finish order
+            results = futures[0].result()
+            for future in futures[1:]:
+                results.merge(future.result())
+    return results
 
-        # log result
-        results.add_result(sb)
+def iter_season(year, start_date, epochs, every=None, interval=None, engine="vectorized", seed=None, chunk_size=1000,
+                sampling="iid", crn=False, target_se=None, min_epochs=min_epochs, playoffs="sampled",
+                elo_mode="static", season=None, stats=False, elo_file=elo_file):
+    # sim_season(workers=1) as a generator of read-only PlayoffResults
+    # snapshots: one every `every` epochs and / or `interval` seconds (checked
+    # as each chunk ends, so use a smaller chunk_size for finer steps), one
+    # after every chunk when neither is given, and always one at the end.
+    # The same seed gives the same final results as sim_season. Leaving the
+    # loop or calling close() cancels the rest of the run
+    pair_size = check_options(sampling, playoffs, elo_mode)
+    epochs = pair_size * -(-epochs // pair_size)
+    seed_seq = np.random.SeedSequence(seed).spawn(1)[0]
+    last_epochs = 0
+    last_time = time.monotonic()
+    results = None
+    for results in shard_chunks(year, start_date, epochs, seed_seq, engine, chunk_size, sampling, crn, target_se,
+                                min_epochs, playoffs, elo_mode, season, elo_file, stats=stats):
+        now = time.monotonic()
+        due = every is None and interval is None
+        due = due or (every is not None and results.epochs - last_epochs >= every)
+        due = due or (interval is not None and now - last_time >= interval)
+        if due:
+            last_epochs = results.epochs
+            last_time = now
+            yield results.snapshot()
+    if results is not None and results.epochs != last_epochs:
+        yield results.snapshot()
 
-        standings.reset()
-    print(results)
+def print_progress(results, epochs):
+    # a progress callback for sim_season that prints the epochs done
+    print(str(results.epochs) + "/" + str(epochs))
+
+def check_options(sampling, playoffs, elo_mode):
+    # validates the run options, returns the epochs per independent sample
+    if playoffs not in ("sampled", "exact"):
+        raise ValueError("unknown playoffs: " + str(playoffs))
+    if elo_mode not in ("static", "dynamic"):
+        raise ValueError("unknown elo_mode: " + str(elo_mode))
+    if sampling == "antithetic":
+        return 2
+    if sampling != "iid":
+        raise ValueError("unknown sampling: " + str(sampling))
+    return 1
+
+def sim_shard(year, start_date, epochs, seed_seq, engine="vectorized", chunk_size=1000, sampling="iid", crn=False,
+              target_se=None, min_epochs=0, playoffs="sampled", elo_mode="static", season=None, progress=None,
+              elo_file=elo_file, bank=None, stats=False):
+    # Runs epochs of the season in this process with the random streams of seed_seq,
+    # stopping early once every standard error is below target_se
+    results = None
+    for results in shard_chunks(year, start_date, epochs, seed_seq, engine, chunk_size, sampling, crn, target_se,
+                                min_epochs, playoffs, elo_mode, season, elo_file, bank, stats):
+        if progress is not None:
+            progress(results, epochs)
     return results
 
-if __name__ == "__main__":
-    time0 = time.time()
-    league_info = LeagueInfo(info_file)
-    season = datetime(year=2022, month=9, day=1)
+def shard_chunks(year, start_date, epochs, seed_seq, engine="vectorized", chunk_size=1000, sampling="iid", crn=False,
+                 target_se=None, min_epochs=0, playoffs="sampled", elo_mode="static", season=None, elo_file=elo_file,
+                 bank=None, stats=False):
+    # The work of sim_shard, yielding its (live) PlayoffResults after every
+    # chunk of epochs
+    antithetic = sampling == "antithetic"
+    rng = np.random.default_rng(seed_seq)
+    py_rng = random.Random(int(seed_seq.generate_state(1, dtype=np.uint64)[0]))
 
     # start_date = datetime.now() # use today's date to stay current
-    start_date = datetime.strptime("9-1-2022", "%m-%d-%Y")
-    elo = pd.read_csv(elo_file)
-    elo = elo[elo["playoff"].isna()]
-    elo["dateObject"] = elo["date"].apply((lambda x: datetime.strptime(x, "%Y-%m-%d")))
-    past_results = elo[(elo["dateObject"] < start_date) & (elo["dateObject"] >= season)]
-    rem_games = elo[elo["dateObject"] >= start_date]
+    # start_date = datetime.strptime(start_date, "%m-%d-%Y")
+    if season is None:
+        season = Season(year, start_date, elo_file)
+    league_info = season.league_info
+    past_results, rem_games = season.past_results, season.rem_games
 
     # encoded_auth = "Basic " + base64.b64encode('{}:{}'.format(key,"MYSPORTSFEEDS").encode('utf-8')).decode('ascii')
     # r = requests.get(standings_url, headers={"Authorization": encoded_auth})
     # info = r.json()["teams"]
     
-    tiebreakers = Tiebreakers(league_info.team_info)
+    tiebreakers = Tiebreakers(league_info.team_info, rng=py_rng)
 
     # 1. Standings contain info from API for already-played games
     # 2. Get remaining game info from elo rankings CSV
@@ -344,83 +1013,117 @@ if __name__ == "__main__":
     # 5. Simulate playoffs and get Super Bowl champion
     # 6. Repeat many times to get probabilities of playoffs and super bowl
 
-    results = PlayoffResults()
-    standings = Standings(league_info, past_results)
-
-    for i in range(num_epochs):
-        if i % 100 == 0:
-            print(str(i) + "/" + str(num_epochs))
-
-        # for each row, updates elo's, gathers probs and team abbrevations,
-        # sims the game, and logs the result - how to vectorize?
-
-        # TODO: this is the bottleneck
-        # Getting: team1, team2, elo_prob1, elo1_pre, elo2_pre
-        # # Sim remaining games
-        # for index, row in rem_games.iterrows():
-        #     team1 = row.team1
-        #     team2 = row.team2
-        #     prob = row.elo_prob1 # prob that team1 wins
-        #     standings.update_elo(team1, row.elo1_pre)
-        #     standings.update_elo(team2, row.elo2_pre)
-        #     rand = random.random()
-        #     result = Result.T1WIN if rand <= prob else Result.T1LOSS
-        #     standings.add_result(team1, team2, result)
-        rem_games.apply(lambda row: sim_reg_game(standings, row.team1, row.team2, row.elo_prob1, row.elo1_pre, row.elo2_pre), axis=1)
-
-        if rem_games.empty:
-            get_last_elos(standings, past_results)
-
-        # if i % 100 == 0:
-        #     print(standings)
-        # Determine seedings
-        # TODO: look into tiebreaker efficiency a bit (maybe no improvement)
-        afc_seeds, nfc_seeds = tiebreakers.get_playoff_seeds(standings)
-        # print(afc_seeds)
-        # print(nfc_seeds)
-        for ind, team in enumerate(afc_seeds):
-            team.playoff_seed = ind + 1
-
-        for ind, team in enumerate(nfc_seeds):
-            team.playoff_seed = ind + 1
-
-        # TODO: This is all pretty fast
-        # sim the playoffs
-        # WILD CARD ROUND
-        awc1 = sim_game(afc_seeds[1], afc_seeds[6])
-        awc2 = sim_game(afc_seeds[2], afc_seeds[5])
-        awc3 = sim_game(afc_seeds[3], afc_seeds[4])
-        nwc1 = sim_game(nfc_seeds[1], nfc_seeds[6])
-        nwc2 = sim_game(nfc_seeds[2], nfc_seeds[5])
-        nwc3 = sim_game(nfc_seeds[3], nfc_seeds[4])
-
-        # DIVISIONAL ROUND
-        # reseed with sorting
-        afc_rem = [awc1, awc2, awc3]
-        afc_rem = sorted(afc_rem, key=lambda x: x.playoff_seed)
-        nfc_rem = [nwc1, nwc2, nwc3]
-        nfc_rem = sorted(nfc_rem, key=lambda x: x.playoff_seed)
-
-        adv1 = sim_game(afc_seeds[0], afc_rem[2])
-        adv2 = sim_game(afc_rem[0], afc_rem[1])
-        ndv1 = sim_game(nfc_seeds[0], nfc_rem[2])
-        ndv2 = sim_game(nfc_rem[0], nfc_rem[1])
-
-        # CONFERENCE ROUND
-        acf = sim_game(adv1, adv2)
-        ncf = sim_game(ndv1, ndv2)
-        
-        # SUPER BOWL
-        sb = sim_game(acf, ncf)
-        #print("Super bowl champ: " + str(sb))
+    results = PlayoffResults([team.name for team in season.baseline.team_list], 2 if antithetic else 1)
+    results.status = season.clinches.status()
+    # phase(name) times a block into results.stats, a no-op without stats
+    phase = no_phase
+    if stats:
+        results.stats = SimStats()
+        phase = results.stats.phase
+        tiebreakers.instrument(results.stats)
+    standings = season.standings()
+    # exact odds by seeds and elos, only shared between epochs when the elos
+    # are static: dynamic ones differ every epoch and would never hit
+    exact_cache = {} if elo_mode == "static" else None
 
-        # log result
-        results.add_result(sb)
+    if engine == "reference":
+        if antithetic or crn:
+            raise ValueError("the reference engine only samples iid")
+        if elo_mode != "static":
+            raise ValueError("the reference engine only uses static elos")
+        if bank is not None:
+            raise ValueError("the reference engine can't keep samples")
+        if season.schedule.forced is not None:
+            raise ValueError("the reference engine can't play pinned games")
+        # epochs of the current chunk, added to results in one go
+        afc, nfc, reached, draws, wins = [], [], [], [], []
+        for i in range(epochs):
+            with phase("regular_season"):
+                rem_games.apply(lambda row: sim_reg_game(standings, row.team1, row.team2, row.elo_prob1, row.elo1_pre, row.elo2_pre, py_rng), axis=1)
 
-        standings.reset()
-    
-    print(results)
-    time1 = time.time()
-    print("Total Time: " + str(round(time1 - time0, 1)) + "s")
-    
-    
\ No newline at end of file
+                if rem_games.empty:
+                    get_last_elos(standings, past_results)
+
+            # TODO: look into tiebreaker efficiency a bit (maybe no improvement)
+            with phase("seeding"):
+                afc_seeds, nfc_seeds = tiebreakers.get_playoff_seeds(standings)
+            afc.append([team.id for team in afc_seeds])
+            nfc.append([team.id for team in nfc_seeds])
+            with phase("playoffs"):
+                if playoffs == "exact":
+                    reached.append(playoff_round_odds(afc_seeds, nfc_seeds, exact_cache))
+                else:
+                    # the draws sim_playoffs would take, played out with the chunk
+                    draws.append([py_rng.random() for _ in range(num_playoff_games)])
+            wins.append(standings.wins.copy())
+            standings.reset()
+            if len(afc) == chunk_size or i + 1 == epochs:
+                afc, nfc = np.array(afc), np.array(nfc)
+                with phase("playoffs"):
+                    if playoffs == "exact":
+                        reached = np.array(reached)
+                    else:
+                        reached = sim_playoffs_batch(standings.win_matrix(), afc, nfc, np.array(draws), rounds=True)[1]
+                with phase("counting"):
+                    results.add_chunk(afc, nfc, reached, np.array(wins))
+                afc, nfc, reached, draws, wins = [], [], [], [], []
+                if results.stats is not None:
+                    results.stats.end_chunk(results.epochs, tiebreakers)
+                yield results
+                if converged(results, target_se, min_epochs, chunk_size):
+                    break
+        return
+    if engine != "vectorized":
+        raise ValueError("unknown engine: " + str(engine))
+
+    schedule = season.schedule
+    standings.set_elos(list(season.final_elos))
+    start_elos = season.start_elos
+    # keep antithetic pairs inside one chunk
+    chunk_size += chunk_size % 2 if antithetic else 0
+    done = 0
+    while done < epochs:
+        n = min(chunk_size, epochs - done)
+        with phase("regular_season"):
+            if elo_mode == "dynamic":
+                outcomes, ratings = schedule.sim_outcomes_dynamic(n, rng, start_elos, antithetic, crn)
+                win = win_matrix(ratings)
+            else:
+                outcomes = schedule.sim_outcomes(n, rng, antithetic, crn)
+                win = standings.win_matrix()
+            # playoff draws come from rng too, so coin flips in py_rng can't
+            # shift them between runs sharing common random numbers
+            playoff_draws = draw_uniforms(rng, n, num_playoff_games, antithetic)
+        with phase("seeding"):
+            afc, nfc = tiebreakers.get_playoff_seeds_batch(standings, schedule, outcomes, season.clinches)
+        with phase("playoffs"):
+            # with exact playoffs the games are only played out for the bank
+            winners = None
+            if playoffs == "sampled" or bank is not None:
+                winners = playoff_games(win, afc, nfc, playoff_draws)
+            if playoffs == "exact":
+                reached = np.empty((n, 14, len(round_names)))
+                for e, (afc_ids, nfc_ids) in enumerate(zip(afc.tolist(), nfc.tolist())):
+                    if elo_mode == "dynamic":
+                        standings.set_elos(ratings[e].tolist())
+                    reached[e] = playoff_round_odds([standings.team_list[i] for i in afc_ids],
+                                                    [standings.team_list[i] for i in nfc_ids], exact_cache)
+            else:
+                reached = rounds_reached(afc, nfc, winners)
+        with phase("counting"):
+            wins = schedule.win_totals(outcomes, standings.base_wins)
+            results.add_chunk(afc, nfc, reached, wins)
+            if bank is not None:
+                bank.add(outcomes, afc, nfc, reached, wins, winners)
+        done += n
+        if results.stats is not None:
+            results.stats.end_chunk(results.epochs, tiebreakers, tiebreakers.batch_fallbacks)
+        yield results
+        if converged(results, target_se, min_epochs, chunk_size):
+            break
+
+def converged(results, target_se, min_epochs, chunk_size):
+    # True at the end of a chunk once the results are precise enough to stop
+    if target_se is None or results.epochs < min_epochs or results.epochs % chunk_size:
+        return False
+    return results.max_std_error() <= target_se
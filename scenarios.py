@@ -0,0 +1,223 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import nflsim
+
+# What-if odds from a run that already happened. Every epoch of the run is
+# kept in a SampleBank, and a scenario (some remaining games pinned to a
+# result or to new odds) is answered from the stored epochs that agree with
+# it, so a query costs a filter and a few bincounts instead of a season.
+# Only when too few stored epochs are left is the pinned season simulated again
+
+class SampleBank:
+    # Every epoch of a run, filled through sim_season(bank=...): the regular
+    # season outcomes bit-packed by game, and the seeds, rounds reached and
+    # win totals PlayoffResults counted for it
+    def __init__(self):
+        self.chunks = []
+        self.num_games = 0
+    def add(self, outcomes, afc, nfc, reached, wins, winners):
+        # the playoff winners aren't kept, reached has what queries need
+        self.num_games = outcomes.shape[1]
+        self.chunks.append((np.packbits(outcomes, axis=1), afc.astype(np.int8), nfc.astype(np.int8),
+                            reached, wins.astype(np.int8)))
+    def join(self):
+        # one array per field, done once the run is over so reads don't copy
+        if len(self.chunks) > 1:
+            self.chunks = [tuple(np.concatenate(parts) for parts in zip(*self.chunks))]
+    @property
+    def epochs(self):
+        return sum(len(chunk[1]) for chunk in self.chunks)
+    def outcomes(self, games):
+        # epochs x len(games) booleans, True where team1 won
+        self.join()
+        games = np.asarray(games, dtype=np.intp)
+        packed = self.chunks[0][0]
+        return (packed[:, games >> 3] >> (7 - (games & 7)) & 1).astype(bool)
+    def conditional_odds(self, teams):
+        # every team's playoff and Super Bowl odds given each game's result,
+        # from one pass over the outcome matrix: a games x teams matrix product
+        # sums the epochs where team1 won. Returns games x teams arrays
+        # (playoffs if team1 wins, if team2 wins, SB if team1 wins, if team2
+        # wins; NaN when no epoch had that result) and the epochs team1 won
+        self.join()
+        packed, afc, nfc, reached, _ = self.chunks[0]
+        epochs = len(afc)
+        won = np.unpackbits(packed, axis=1, count=self.num_games).astype(np.float64)
+        ids = np.concatenate([afc, nfc], axis=1).astype(np.intp)
+        rows = np.arange(epochs)[:, None]
+        made = np.zeros((epochs, teams))
+        made[rows, ids] = 1
+        sbs = np.zeros((epochs, teams))
+        sbs[rows, ids] = reached[:, :, -1]
+        wins1 = won.sum(axis=0)[:, None]
+        wins2 = epochs - wins1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            odds = []
+            for values in (made, sbs):
+                if1 = won.T @ values
+                odds += [if1 / wins1, (values.sum(axis=0) - if1) / wins2]
+        return odds, wins1[:, 0]
+    def results(self, names, weights):
+        # weighted PlayoffResults over the epochs with a non-zero weight
+        self.join()
+        results = nflsim.PlayoffResults(names, weighted=True)
+        keep = np.flatnonzero(weights)
+        if len(keep):
+            _, afc, nfc, reached, wins = self.chunks[0]
+            results.add_chunk(afc[keep].astype(np.intp), nfc[keep].astype(np.intp), reached[keep], wins[keep],
+                              weights[keep])
+        return results
+
+class WhatIf:
+    # What-if queries on year from start_date, answered from one stored run of
+    # epochs (seed, chunk_size, playoffs and elo_mode as in sim_season).
+    # pins maps the index of a remaining game (in season.schedule, see games())
+    # to its winner's abbreviation, True / False for a team1 win / loss, or a
+    # float chance of team1 winning:
+    # - results keep only the stored epochs where those games went that way
+    # - chances reweight every stored epoch by the likelihood ratio of its
+    #   results under the new and the old odds (static elos only)
+    # When the effective sample size left is below min_ess the pinned season
+    # is simulated again with resim_epochs, and the last cache_size of those
+    # runs are kept by pins
+    def __init__(self, year, start_date, epochs=nflsim.num_epochs, min_ess=1000, resim_epochs=None, seed=None,
+                 chunk_size=1000, playoffs="sampled", elo_mode="static", season=None, cache_size=16,
+                 elo_file=nflsim.elo_file):
+        if season is None:
+            season = nflsim.Season(year, start_date, elo_file)
+        self.year = year
+        self.start_date = start_date
+        self.season = season
+        self.min_ess = min_ess
+        self.resim_epochs = epochs if resim_epochs is None else resim_epochs
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.playoffs = playoffs
+        self.elo_mode = elo_mode
+        self.elo_file = elo_file
+        self.names = [team.name for team in season.baseline.team_list]
+        self.bank = SampleBank()
+        self.results = nflsim.sim_season(year, start_date, epochs, seed=seed, chunk_size=chunk_size, playoffs=playoffs,
+                                         elo_mode=elo_mode, season=season, bank=self.bank, elo_file=elo_file)
+        self.bank.join()
+        self.lock = threading.Lock()
+        self.resims = OrderedDict()
+        self.cache_size = cache_size
+    def games(self):
+        # the remaining games pins can refer to
+        schedule = self.season.schedule
+        dates = self.season.rem_games["dateObject"].dt.strftime("%Y-%m-%d").tolist()
+        return [{"game": g, "date": date, "team1": t1, "team2": t2, "team1_win_prob": round(p, 4)}
+                for g, (date, t1, t2, p) in enumerate(zip(dates, schedule.t1abbs, schedule.t2abbs,
+                                                          schedule.elo_prob1.tolist()))]
+    def leverage(self, top=None, teams_per_game=4):
+        # the remaining games ranked by how far they move the playoff odds:
+        # the total over every team of the gap between its odds if team1 wins
+        # and if team2 wins, in percentage points. Each game lists the
+        # teams_per_game teams it moves most
+        (playoffs1, playoffs2, sbs1, sbs2), wins1 = self.bank.conditional_odds(len(self.names))
+        playoff_swing = np.nan_to_num(np.abs(playoffs1 - playoffs2))
+        sb_swing = np.nan_to_num(np.abs(sbs1 - sbs2))
+        games = self.games()
+        for g, game in enumerate(games):
+            game["samples_if_team1"] = int(wins1[g])
+            game["samples_if_team2"] = self.bank.epochs - int(wins1[g])
+            game["playoff_swing"] = percentage(playoff_swing[g].sum())
+            game["sb_swing"] = percentage(sb_swing[g].sum())
+            game["teams"] = [{"team_name": self.names[t],
+                              "playoffs_if_team1": percentage(playoffs1[g, t]),
+                              "playoffs_if_team2": percentage(playoffs2[g, t]),
+                              "sb_if_team1": percentage(sbs1[g, t]),
+                              "sb_if_team2": percentage(sbs2[g, t])}
+                             for t in np.argsort(-playoff_swing[g], kind="stable")[:teams_per_game].tolist()]
+        games.sort(key=lambda game: (game["playoff_swing"], game["sb_swing"]), reverse=True)
+        return games[:top]
+    def check_pins(self, pins):
+        # pins with int game indices and True / False or float values
+        if not isinstance(pins, dict):
+            raise ValueError("pins must map games to results or odds")
+        schedule = self.season.schedule
+        checked = {}
+        for game, pin in pins.items():
+            try:
+                game = int(game)
+            except (TypeError, ValueError):
+                raise ValueError("no remaining game " + str(game))
+            if not 0 <= game < schedule.num_games:
+                raise ValueError("no remaining game " + str(game))
+            if isinstance(pin, str):
+                if pin.upper() not in (schedule.t1abbs[game], schedule.t2abbs[game]):
+                    raise ValueError(pin + " doesn't play game " + str(game))
+                pin = pin.upper() == schedule.t1abbs[game]
+            elif isinstance(pin, (bool, np.bool_)):
+                pin = bool(pin)
+            elif isinstance(pin, (int, float)):
+                pin = float(pin)
+                if not 0 <= pin <= 1:
+                    raise ValueError("game " + str(game) + " odds must be between 0 and 1")
+                if self.elo_mode != "static":
+                    raise ValueError("odds can only be pinned with static elos")
+            else:
+                raise ValueError("game " + str(game) + " must be pinned to a team, true / false or odds")
+            checked[game] = pin
+        return checked
+    def weights(self, pins):
+        # each stored epoch's weight under checked pins, scaled so the
+        # weights add up to the number of epochs kept
+        weights = np.ones(self.bank.epochs)
+        games = sorted(pins)
+        if not games:
+            return weights
+        outcomes = self.bank.outcomes(games)
+        for k, game in enumerate(games):
+            pin = pins[game]
+            if isinstance(pin, bool):
+                weights *= outcomes[:, k] == pin
+            else:
+                p = self.season.schedule.elo_prob1[game]
+                weights *= np.where(outcomes[:, k], pin / p, (1 - pin) / (1 - p))
+        kept = np.count_nonzero(weights)
+        if kept:
+            weights *= kept / weights.sum()
+        return weights
+    def odds(self, pins, resimulate=True):
+        # PlayoffResults under pins: weighted results from the stored run, or
+        # (unweighted) results of a new run when too few epochs agree. With
+        # resimulate=False that run isn't started here: the results are None
+        # unless it is cached, and resimulate(check_pins(pins)) runs it
+        pins = self.check_pins(pins)
+        results = self.bank.results(self.names, self.weights(pins))
+        results.status = self.results.status
+        if results.samples() >= self.min_ess:
+            return results
+        if not resimulate:
+            return self.cached(pins)
+        return self.resimulate(pins)
+    def cached(self, pins):
+        # the cached resimulation under checked pins, or None
+        key = tuple(sorted(pins.items()))
+        with self.lock:
+            results = self.resims.get(key)
+            if results is not None:
+                self.resims.move_to_end(key)
+            return results
+    def resimulate(self, pins):
+        key = tuple(sorted(pins.items()))
+        results = self.cached(pins)
+        if results is not None:
+            return results
+        results = nflsim.sim_season(self.year, self.start_date, self.resim_epochs, seed=self.seed,
+                                    chunk_size=self.chunk_size, playoffs=self.playoffs, elo_mode=self.elo_mode,
+                                    season=self.season.pinned(pins), elo_file=self.elo_file).snapshot()
+        with self.lock:
+            self.resims[key] = results
+            if len(self.resims) > self.cache_size:
+                self.resims.popitem(last=False)
+        return results
+
+def percentage(p):
+    # a probability as a rounded percentage, None when there was no sample
+    return None if np.isnan(p) else round(float(p) * 100, 2)
@@ -0,0 +1,126 @@
+import contextlib
+import time
+
+import numpy as np
+
+# Where a run spends its time and how its ties get broken, collected when
+# sim_season runs with stats=True and handed back as results.stats.
+# Nothing here is touched by a run without stats: the simulation loop uses
+# no_phase for its timers and Tiebreakers is only wrapped by instrument()
+
+# phases timed per chunk of epochs. Wild card resolution happens inside
+# seeding, so its time is part of the seeding time too
+phase_names = ["regular_season", "seeding", "wildcards", "playoffs", "counting"]
+num_tiebreakers = 11
+# tiebreakerN run by each step of Tiebreakers.pair_scores, for division
+# rivals and for wild card pairs (None where the step doesn't apply), the
+# last step being the coin flip
+pair_steps = {"division": [1, 2, 3, 4, 5], "wildcard": [1, 4, 3, None, 5]}
+coin_flips = [5, 10]
+
+null_phase = contextlib.nullcontext()
+
+def no_phase(name):
+    return null_phase
+
+class PhaseTimer:
+    __slots__ = ("stats", "name", "start")
+    def __init__(self, stats, name):
+        self.stats = stats
+        self.name = name
+    def __enter__(self):
+        self.start = time.perf_counter()
+    def __exit__(self, kind, value, traceback):
+        self.stats.phases[self.name] += time.perf_counter() - self.start
+
+class SimStats:
+    # phases[name] - cumulative seconds in each of phase_names
+    # reached[k] / resolved[k] - ties that got to tiebreakerk, and those it
+    #   settled (picked a winner, or cut a 3+ team tie down). Ties answered
+    #   from the tie cache aren't worked through again and only count as hits
+    # fallback_epochs - epochs the batch seeding handed to get_playoff_seeds
+    def __init__(self):
+        self.epochs = 0
+        self.phases = dict.fromkeys(phase_names, 0.0)
+        self.reached = [0] * (num_tiebreakers + 1)
+        self.resolved = [0] * (num_tiebreakers + 1)
+        self.fallback_epochs = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+    def phase(self, name):
+        # context manager adding the time spent inside it to phases[name]
+        return PhaseTimer(self, name)
+    def timed(self, name, fn):
+        # fn with its calls timed into phases[name]
+        def timed_fn(*args):
+            with PhaseTimer(self, name):
+                return fn(*args)
+        return timed_fn
+    def counted(self, k, fn):
+        # tiebreakerk with its calls counted. A tiebreaker returns the teams
+        # still tied, and may shorten the list it was given in place
+        def counted_fn(*args):
+            given = len(args[0]) if isinstance(args[0], list) else 2
+            left = fn(*args)
+            self.reached[k] += 1
+            self.resolved[k] += len(left) < given
+            return left
+        return counted_fn
+    def count_pairs(self, same_div, steps):
+        # the two-team ties pair_scores broke in batch: steps holds each
+        # step's scores, the first non-zero one decides, the coin otherwise
+        nonzero = np.array([step != 0 for step in steps], dtype=bool)
+        decided = np.where(nonzero.any(axis=0), nonzero.argmax(axis=0), len(steps))
+        for kind, mask in (("division", same_div), ("wildcard", ~same_div)):
+            at = decided[mask]
+            for step, k in enumerate(pair_steps[kind]):
+                if k is not None:
+                    self.reached[k] += int(np.count_nonzero(at >= step))
+                    self.resolved[k] += int(np.count_nonzero(at == step))
+    def end_chunk(self, epochs, tiebreakers, fallbacks=0):
+        # the run's totals as a chunk ends: its epochs so far, the tie cache
+        # counts of its Tiebreakers and the epochs that chunk fell back on
+        self.epochs = epochs
+        self.cache_hits = tiebreakers.cache_hits
+        self.cache_misses = tiebreakers.cache_misses
+        self.fallback_epochs += fallbacks
+    @property
+    def coin_flips(self):
+        return sum(self.reached[k] for k in coin_flips)
+    def merge(self, other):
+        # adds the counts of another shard's stats into these
+        self.epochs += other.epochs
+        for name in phase_names:
+            self.phases[name] += other.phases[name]
+        for k in range(num_tiebreakers + 1):
+            self.reached[k] += other.reached[k]
+            self.resolved[k] += other.resolved[k]
+        self.fallback_epochs += other.fallback_epochs
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        return self
+    def copy(self):
+        other = SimStats()
+        return other.merge(self)
+    def as_dict(self):
+        per_epoch = 1 / max(self.epochs, 1)
+        return {"epochs": self.epochs,
+                "phases": dict(self.phases),
+                "tiebreakers": {"tiebreaker" + str(k): {"reached": self.reached[k], "resolved": self.resolved[k]}
+                                for k in range(1, num_tiebreakers + 1)},
+                "coin_flips": self.coin_flips,
+                "coin_flips_per_epoch": self.coin_flips * per_epoch,
+                "fallback_epochs": self.fallback_epochs,
+                "tie_cache": {"hits": self.cache_hits, "misses": self.cache_misses}}
+    def __repr__(self):
+        out = "Phases (" + str(self.epochs) + " epochs):\n"
+        for name in phase_names:
+            out += "  " + name + ": " + "{:.3f}".format(self.phases[name]) + "s\n"
+        out += "Tiebreakers (reached / resolved):\n"
+        for k in range(1, num_tiebreakers + 1):
+            if self.reached[k]:
+                out += "  tiebreaker" + str(k) + ": " + str(self.reached[k]) + " / " + str(self.resolved[k]) + "\n"
+        out += "Coin flips: " + str(self.coin_flips) + " (" + "{:.4f}".format(self.coin_flips / max(self.epochs, 1)) + " per epoch)\n"
+        out += "Batch fallback epochs: " + str(self.fallback_epochs) + "\n"
+        out += "Tie cache hits / misses: " + str(self.cache_hits) + " / " + str(self.cache_misses) + "\n"
+        return out
@@ -0,0 +1,69 @@
+import json
+import threading
+import unittest
+from datetime import datetime
+
+import app
+from nflsim import SeasonCache
+from scenarios import WhatIf
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestWhatIfBuild(unittest.TestCase):
+    def setUp(self):
+        app.season_cache = SeasonCache(elo_file=elo_file)
+        app.what_ifs.clear()
+        app.what_if_jobs.clear()
+        self.client = app.app.test_client()
+
+    def test_one_build_per_season(self):
+        args = {"year": 2022, "start_week": "2023-01-07"}
+        responses = []
+        def get():
+            with app.app.test_client() as client:
+                responses.append(client.get("/games", query_string=args))
+        threads = [threading.Thread(target=get) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # every request is answered at once, all by the same build job
+        self.assertEqual([r.status_code for r in responses], [202] * 4)
+        job_ids = {r.get_json()["job_id"] for r in responses}
+        self.assertEqual(len(job_ids), 1)
+        job = app.jobs.get(job_ids.pop())
+        state = job.wait(None, timeout=0)
+        while not job.finished():
+            state = job.wait(state["version"], timeout=60)
+        self.assertEqual(state["status"], "done")
+        response = self.client.get("/games", query_string=args)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.get_json()), 0)
+        self.assertEqual(self.client.get("/leverage", query_string=dict(args, top=3)).status_code, 200)
+
+    def test_resimulation_job(self):
+        start_week = datetime(2022, 12, 1)
+        season = app.season_cache.get(2022, start_week)
+        what_if = WhatIf(2022, start_week, 2000, min_ess=500, seed=2, chunk_size=500, season=season,
+                         elo_file=elo_file)
+        app.what_ifs[(2022, start_week)] = what_if
+        form = {"year": 2022, "start_week": "2022-12-01"}
+        for pins in ("[0]", "3", '{"0": null}'):
+            self.assertEqual(self.client.post("/what_if", data=dict(form, pins=pins)).status_code, 400)
+        # too few stored epochs agree with these pins, so they're resimulated by a job
+        pins = json.dumps({g["game"]: g["team1"] for g in what_if.games()[:8]})
+        response = self.client.post("/what_if", data=dict(form, pins=pins))
+        self.assertEqual(response.status_code, 202)
+        job = app.jobs.get(response.get_json()["job_id"])
+        self.assertEqual(self.client.post("/what_if", data=dict(form, pins=pins)).get_json()["job_id"], job.id)
+        state = job.wait(None, timeout=0)
+        while not job.finished():
+            state = job.wait(state["version"], timeout=60)
+        self.assertEqual(state["status"], "done")
+        response = self.client.post("/what_if", data=dict(form, pins=pins))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["resimulated"])
+        self.assertEqual(response.get_json()["epochs"], 2000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from archive import Archive, write_archive
+from nflsim import Season, sim_season
+from scenarios import SampleBank
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestArchive(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "run.nflsim")
+        self.start_date = datetime(year=2022, month=12, day=1)
+        self.season = Season(2022, self.start_date, elo_file)
+        self.results = write_archive(self.path, 2022, self.start_date, 3000, seed=4, chunk_size=700,
+                                     season=self.season, elo_file=elo_file)
+        self.archive = Archive(self.path, chunk_size=1000)
+
+    @classmethod
+    def tearDownClass(self):
+        del self.archive
+        self.dir.cleanup()
+
+    def test_header(self):
+        header = self.archive.header
+        self.assertEqual(header["year"], 2022)
+        self.assertEqual(header["start_date"], "2022-12-01")
+        self.assertEqual(header["seed"], 4)
+        self.assertEqual(len(header["elo_sha1"]), 40)
+        self.assertEqual(self.archive.num_games, self.season.schedule.num_games)
+        self.assertEqual(self.archive.epochs, 3000)
+        self.assertEqual(os.listdir(self.dir.name), ["run.nflsim"])
+
+    def test_matches_results(self):
+        counts = self.archive.seed_counts()
+        self.assertTrue((counts == self.results.seeds).all())
+        # each team's playoff wins and byes add up to the rounds it went on to reach
+        wins = self.archive.win_counts()
+        self.assertTrue((wins.sum(axis=1) + counts[:, 0] == self.results.rounds.sum(axis=1)).all())
+        self.assertEqual(wins[:, 3].sum(), 3000)
+
+    def test_outcomes_match_bank(self):
+        bank = SampleBank()
+        sim_season(2022, self.start_date, 3000, seed=4, chunk_size=700, season=self.season, bank=bank,
+                   elo_file=elo_file)
+        games = [0, 5, self.archive.num_games - 1]
+        self.assertTrue((self.archive.outcomes(games) == bank.outcomes(games)).all())
+        self.assertTrue((self.archive.outcomes()[:, games] == bank.outcomes(games)).all())
+
+    def test_where(self):
+        outcomes = self.archive.outcomes([0, 3])
+        mask = self.archive.where({0: True, 3: False})
+        self.assertTrue((mask == (outcomes[:, 0] & ~outcomes[:, 1])).all())
+        counts = self.archive.seed_counts(mask)
+        self.assertTrue((counts.sum(axis=1) == np.count_nonzero(mask)).all())
+        self.assertTrue((counts[:, :7].sum(axis=0) == 2 * np.count_nonzero(mask)).all())
+
+    def test_not_an_archive(self):
+        with self.assertRaises(ValueError):
+            Archive(elo_file)
+
+if __name__ == '__main__':
+    unittest.main()
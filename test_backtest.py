@@ -0,0 +1,24 @@
+import unittest
+
+import backtest
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestBacktest(unittest.TestCase):
+    def test_load_seeds(self):
+        seeds = backtest.load_seeds()
+        self.assertEqual(len(seeds), 2 * 21)
+        self.assertEqual(len(seeds[(2019, "AFC")]), 6)
+        self.assertEqual(seeds[(2022, "NFC")], ["PHI", "SF", "MIN", "TB", "DAL", "NYG", "SEA"])
+
+    def test_diff(self):
+        seeds = {(2021, "AFC"): ["TEN"], (2022, "AFC"): ["KC", "BUF"], (2022, "NFC"): ["SF", "PHI"]}
+        seeded = backtest.run([2021, 2022], workers=2, elo_file=elo_file, seeds=seeds)
+        self.assertEqual(seeded, backtest.run([2022], elo_file=elo_file, seeds=seeds))
+        mismatches = backtest.diff(seeded, seeds)
+        self.assertEqual([(m["season"], m["conf"]) for m in mismatches], [(2021, "AFC"), (2022, "NFC")])
+        self.assertIsNone(mismatches[0]["simulated"])
+        self.assertEqual(mismatches[1]["simulated"], ["PHI", "SF"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import bench
+
+class TestBench(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.history = os.path.join(self.dir.name, "history.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_run_and_compare(self):
+        entry = bench.run(["2023-01-07"], [50], repeat=1, label="test")
+        self.assertEqual(sorted(entry["timings"]),
+                         sorted(["load/2023-01-07", "standings/2023-01-07"]
+                                + [name + "/2023-01-07/50" for name in bench.case_names[2:]]))
+        self.assertTrue(all(t["min"] <= t["median"] for t in entry["timings"].values()))
+        bench.save_run(entry, self.history)
+        slower = copy.deepcopy(entry)
+        slower["timings"]["end_to_end/2023-01-07/50"]["min"] *= 2
+        bench.save_run(slower, self.history)
+        self.assertEqual(len(bench.load_history(self.history)), 2)
+
+        rows = {row[0]: row for row in bench.compare(entry, slower)}
+        self.assertEqual(rows["end_to_end/2023-01-07/50"][4], "slower")
+        self.assertEqual(rows["seeding/2023-01-07/50"][4], "")
+        self.assertEqual(bench.main(["--history", self.history, "compare"]), 1)
+        self.assertEqual(bench.main(["--history", self.history, "compare", "--base", "1", "--new", "0"]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import random
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from clinches import Clinches, can_hold
+from nflsim import Season, sim_season
+from tiebreakers import Tiebreakers
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestCanHold(unittest.TestCase):
+    def test_flow(self):
+        # three teams, each pair with two games left: six wins to hand out
+        games = np.triu(np.full((3, 3), 2) - 2 * np.eye(3, dtype=int))
+        self.assertTrue(can_hold([0, 1, 2], games, np.array([2, 2, 2])))
+        self.assertFalse(can_hold([0, 1, 2], games, np.array([3, 2, 0])))
+        self.assertTrue(can_hold([0, 1, 2], games, np.array([4, 2, 0])))
+        self.assertFalse(can_hold([0, 1], games, np.array([1, 0, -1])))
+
+class TestClinches(unittest.TestCase):
+    def test_matches_simulation(self):
+        # whatever is decided is decided in every simulated season
+        for start_date in [datetime(2022, 12, 20), datetime(2023, 1, 1), datetime(2023, 1, 8)]:
+            season = Season(2022, start_date, elo_file)
+            c = season.clinches
+            results = sim_season(2022, start_date, 1000, seed=1, season=season, elo_file=elo_file)
+            seeds = results.seeds
+            self.assertTrue((seeds[c.playoffs, 7] == 0).all())
+            self.assertTrue((seeds[c.out_playoffs, :7] == 0).all())
+            self.assertTrue((seeds[c.division, :4].sum(axis=1) == 1000).all())
+            self.assertTrue((seeds[c.out_division, :4] == 0).all())
+            self.assertTrue((seeds[c.bye, 0] == 1000).all())
+            self.assertTrue((seeds[c.out_bye, 0] == 0).all())
+            self.assertFalse((c.playoffs & c.out_playoffs).any())
+
+    def test_status(self):
+        season = Season(2022, datetime(2023, 1, 8), elo_file)
+        status = dict(zip(season.league_info.abbs, season.clinches.status()))
+        self.assertEqual(status["KC"], "z")
+        self.assertEqual(status["HOU"], "e")
+        self.assertEqual(status["MIA"], "")
+        row = sim_season(2022, datetime(2023, 1, 8), 100, seed=1, season=season, elo_file=elo_file).table_repr()
+        kc = next(r for r in row if r["team_name"] == "KANSAS CITY CHIEFS")
+        self.assertEqual((kc["status"], kc["playoff_percentage"], kc["playoff_std_error"]), ("z", 100, 0))
+
+    def test_early_season_open(self):
+        c = Season(2022, datetime(2022, 9, 1), elo_file).clinches
+        for decided in (c.division, c.playoffs, c.bye, c.out_division, c.out_playoffs, c.out_bye):
+            self.assertFalse(decided.any())
+
+    def test_pruned_seeds_match(self):
+        season = Season(2022, datetime(2023, 1, 1), elo_file)
+        outcomes = season.schedule.sim_outcomes(500, np.random.default_rng(0))
+        seeds = []
+        for clinches in (None, season.clinches):
+            tiebreakers = Tiebreakers(season.league_info.team_info, rng=random.Random(0))
+            seeds.append(tiebreakers.get_playoff_seeds_batch(season.standings(), season.schedule, outcomes, clinches))
+        self.assertTrue((seeds[0][0] == seeds[1][0]).all())
+        self.assertTrue((seeds[0][1] == seeds[1][1]).all())
+
+if __name__ == '__main__':
+    unittest.main()
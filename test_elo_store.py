@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+import pandas as pd
+
+import elo_store
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestEloStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.csv = os.path.join(self.dir, "elo.csv")
+        shutil.copy(elo_file, self.csv)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_columns_match_csv(self):
+        csv = pd.read_csv(self.csv)
+        store = elo_store.load(self.csv)
+        self.assertEqual(store.rows, csv.shape[0])
+        self.assertIsInstance(store["elo1_pre"], np.memmap)
+        self.assertEqual(store["elo1_pre"].dtype, np.float32)
+        self.assertTrue(np.allclose(store["elo_prob1"], csv["elo_prob1"], rtol=1e-6))
+        self.assertEqual([store.teams[i] for i in store["team1"]], csv["team1"].tolist())
+        self.assertEqual((store["playoff"] > 0).sum(), csv["playoff"].notna().sum())
+
+        frame = store.frame()
+        regular = csv[csv["playoff"].isna()].reset_index(drop=True)
+        self.assertEqual(frame["team2"].tolist(), regular["team2"].tolist())
+        self.assertEqual(frame["dateObject"].dt.strftime("%Y-%m-%d").tolist(), regular["date"].tolist())
+        self.assertTrue(np.allclose(frame["score1"], regular["score1"], equal_nan=True))
+        self.assertTrue(frame["playoff"].isna().all())
+
+    def test_reuse_and_invalidate(self):
+        path = elo_store.store_path(self.csv)
+        before = elo_store.load(self.csv)
+        built = os.stat(path)
+        # touching the csv keeps the store since its hash is unchanged, and
+        # the new mtime is recorded so only the first load hashes it
+        touched = built.st_mtime_ns + 10 ** 9
+        os.utime(self.csv, ns=(touched, touched))
+        with unittest.mock.patch("elo_store.file_hash", wraps=elo_store.file_hash) as file_hash:
+            store = elo_store.load(self.csv)
+            self.assertEqual(file_hash.call_count, 1)
+            self.assertEqual(store.header["source_mtime_ns"], touched)
+            self.assertTrue(np.allclose(store["elo1_pre"], pd.read_csv(self.csv)["elo1_pre"], rtol=1e-6))
+            elo_store.load(self.csv)
+            self.assertEqual(file_hash.call_count, 1)
+        # the header was replaced, not rewritten under the store mapped before
+        self.assertNotEqual(os.stat(path).st_ino, built.st_ino)
+        self.assertEqual(elo_store.read_header(path)[0], store.header)
+        self.assertTrue(np.array_equal(before["elo1_pre"], store["elo1_pre"]))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["elo.csv", "elo.csv.bin"])
+
+        csv = pd.read_csv(self.csv)
+        csv.loc[0, "elo1_pre"] = 1000
+        csv.to_csv(self.csv, index=False)
+        self.assertEqual(elo_store.load(self.csv)["elo1_pre"][0], 1000)
+
+if __name__ == '__main__':
+    unittest.main()
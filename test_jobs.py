@@ -0,0 +1,70 @@
+import threading
+import unittest
+
+from jobs import *
+
+class TestJobQueue(unittest.TestCase):
+    def test_updates_and_finish(self):
+        queue = JobQueue(workers=1)
+        release = threading.Event()
+        def run(job):
+            job.update(1, 2, [{"team_name": "A"}])
+            release.wait(5)
+            job.update(2, 2, [{"team_name": "B"}])
+        job = queue.submit(run)
+        self.assertIs(queue.get(job.id), job)
+        state = job.wait(0, timeout=5)
+        self.assertEqual((state["status"], state["done"], state["table"]), ("running", 1, [{"team_name": "A"}]))
+        # nothing new until the job moves on
+        self.assertEqual(job.wait(state["version"], timeout=0.05)["version"], state["version"])
+        release.set()
+        while state["status"] != "done":
+            state = job.wait(state["version"], timeout=5)
+        self.assertEqual(state["done"], 2)
+        self.assertEqual(state["table"], [{"team_name": "B"}])
+
+    def test_failure(self):
+        queue = JobQueue(workers=1)
+        def run(job):
+            raise ValueError("bad start date")
+        job = queue.submit(run)
+        state = job.wait(0, timeout=5)
+        self.assertEqual(state["status"], "failed")
+        self.assertEqual(state["error"], "bad start date")
+
+    def test_cancel(self):
+        queue = JobQueue(workers=1)
+        def run(job):
+            job.update(1, 10, None)
+            job.cancelled.wait(5)
+        job = queue.submit(run)
+        state = job.wait(0, timeout=5)
+        job.cancel()
+        while not job.finished():
+            state = job.wait(state["version"], timeout=5)
+        self.assertEqual(state["status"], "cancelled")
+
+    def test_bounded(self):
+        queue = JobQueue(workers=1, max_pending=2, keep=1)
+        release = threading.Event()
+        held = [queue.submit(lambda job: release.wait(5)) for _ in range(2)]
+        with self.assertRaises(QueueFull):
+            queue.submit(lambda job: None)
+        release.set()
+        queue.pool.shutdown(wait=True)
+        self.assertTrue(all(job.finished() for job in held))
+        self.assertEqual(queue.pending, 0)
+
+    def test_keeps_newest_finished(self):
+        queue = JobQueue(workers=1, keep=1)
+        first = queue.submit(lambda job: None)
+        first.wait(0, timeout=5)
+        second = queue.submit(lambda job: None)
+        second.wait(0, timeout=5)
+        third = queue.submit(lambda job: None)
+        self.assertIsNone(queue.get(first.id))
+        self.assertIs(queue.get(second.id), second)
+        self.assertIs(queue.get(third.id), third)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,478 @@
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+import unittest.mock
+
+from nflsim import *
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestRegularSeasonEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.leagueInfo = LeagueInfo("team_info.csv")
+        elo = load_elo(elo_file)
+        self.start_date = datetime(year=2022, month=12, day=1)
+        self.rem_games = elo[elo["dateObject"] >= self.start_date]
+        self.schedule = Schedule(self.leagueInfo, self.rem_games)
+
+    def test_schedule_arrays(self):
+        n = self.rem_games.shape[0]
+        self.assertEqual(self.schedule.num_games, n)
+        self.assertEqual(self.schedule.t1.shape, (n,))
+        for g in range(n):
+            self.assertEqual(self.leagueInfo.abbs[self.schedule.t1[g]], self.schedule.t1abbs[g])
+            self.assertEqual(self.leagueInfo.abbs[self.schedule.t2[g]], self.schedule.t2abbs[g])
+
+    def test_sim_outcomes(self):
+        rng = np.random.default_rng(0)
+        outcomes = self.schedule.sim_outcomes(20000, rng)
+        self.assertEqual(outcomes.shape, (20000, self.schedule.num_games))
+        self.assertEqual(outcomes.dtype, np.bool_)
+        # empirical win rates should match elo_prob1
+        self.assertTrue(np.allclose(outcomes.mean(axis=0), self.schedule.elo_prob1, atol=0.02))
+
+    def test_sim_outcomes_dynamic(self):
+        elo = load_elo(elo_file)
+        past_results = elo[(elo["dateObject"] < self.start_date) & (elo["season"] == 2022)]
+        current = get_current_elos(past_results, self.rem_games)
+        elos = np.array([current[abb] for abb in self.leagueInfo.abbs])
+        for week in self.schedule.weeks:
+            teams = np.concatenate([self.schedule.t1[week], self.schedule.t2[week]])
+            self.assertEqual(len(set(teams.tolist())), len(teams))
+        outcomes, ratings = self.schedule.sim_outcomes_dynamic(20000, np.random.default_rng(0), elos)
+        self.assertEqual(outcomes.shape, (20000, self.schedule.num_games))
+        # each week's first games start from the csv's ratings and odds,
+        # and elo updates only move points between teams
+        first = self.schedule.weeks[0]
+        self.assertTrue(np.allclose(outcomes[:, first].mean(axis=0), self.schedule.elo_prob1[first], atol=0.02))
+        self.assertTrue(np.allclose(ratings.sum(axis=1), elos.sum()))
+        self.assertGreater(ratings.std(axis=0).min(), 0)
+        # an upset costs the favorite rating
+        g = first[np.argmax(self.schedule.elo_prob1[first])]
+        t1 = self.schedule.t1[g]
+        self.assertLess(ratings[~outcomes[:, g], t1].mean(), ratings[outcomes[:, g], t1].mean())
+
+    def test_sim_season_dynamic(self):
+        r = sim_season(2022, self.start_date, 40, seed=3, elo_mode="dynamic", elo_file=elo_file)
+        self.assertEqual(sum(r.teams_to_sbs.values()), 40)
+        r = sim_season(2022, self.start_date, 40, seed=3, elo_mode="dynamic", playoffs="exact", elo_file=elo_file)
+        self.assertAlmostEqual(sum(r.teams_to_sbs.values()), 40)
+
+    def test_exact_cache_bounded(self):
+        # static elos share one entry per seeding, dynamic ones keep none
+        caches = []
+        def recorded(afc_seeds, nfc_seeds, cache=None):
+            caches.append(cache)
+            return round_odds(afc_seeds, nfc_seeds, cache)
+        round_odds = playoff_round_odds
+        with unittest.mock.patch("nflsim.playoff_round_odds", recorded):
+            for elo_mode in ("static", "dynamic"):
+                caches.clear()
+                sim_season(2022, datetime(year=2023, month=1, day=7), 400, seed=3, elo_mode=elo_mode, playoffs="exact",
+                           elo_file=elo_file)
+                self.assertEqual(len(caches), 400)
+                if elo_mode == "static":
+                    self.assertLess(len(caches[-1]), 100)
+                else:
+                    self.assertTrue(all(cache is None for cache in caches))
+
+    def test_sim_season_seeded(self):
+        r1 = sim_season(2022, self.start_date, 20, seed=3, elo_file=elo_file)
+        self.assertEqual(r1.epochs, 20)
+        self.assertEqual(sum(r1.teams_to_sbs.values()), 20)
+        r2 = sim_season(2022, self.start_date, 20, engine="reference", elo_file=elo_file)
+        self.assertEqual(r2.epochs, 20)
+
+class TestVarianceReduction(unittest.TestCase):
+    def test_antithetic_draws(self):
+        u = draw_uniforms(np.random.default_rng(0), 5, 3, antithetic=True)
+        self.assertEqual(u.shape, (5, 3))
+        self.assertTrue(np.allclose(u[0] + u[1], 1))
+        self.assertTrue(np.allclose(u[2] + u[3], 1))
+
+    def test_standard_errors(self):
+        results = PlayoffResults(["KANSAS CITY CHIEFS"])
+        results.rounds[0, -1] = 25
+        results.sbs_sq[0] = 25
+        results.epochs = 100
+        se = results.standard_errors()["KANSAS CITY CHIEFS"]["sb"]
+        self.assertAlmostEqual(se, (0.25 * 0.75 / 99) ** 0.5)
+
+    def test_weighted_standard_errors(self):
+        # non-uniform weights, independent of the outcomes
+        rng = np.random.default_rng(0)
+        epochs = 20000
+        afc = np.tile(np.arange(7), (epochs, 1))
+        nfc = afc + 7
+        reached = np.zeros((epochs, 14, len(round_names)))
+        champs = rng.integers(14, size=epochs)
+        reached[np.arange(epochs), champs, -1] = 1
+        weights = np.where(rng.random(epochs) < 0.5, 0.5, 1.5)
+        errors = []
+        for scale in (1, 2):
+            results = PlayoffResults([str(t) for t in range(14)], weighted=True)
+            results.add_chunk(afc, nfc, reached, np.zeros((epochs, 14), dtype=np.intp), weights * scale)
+            errors.append(np.array([e["sb"] for e in results.standard_errors().values()]))
+        self.assertTrue(np.allclose(errors[0], errors[1]))
+        # the direct sqrt(sum w^2 (x - p)^2) / sum w
+        x = reached[:, :, -1]
+        p = weights @ x / weights.sum()
+        direct = np.sqrt((weights[:, None] ** 2 * (x - p) ** 2).sum(axis=0)) / weights.sum()
+        self.assertTrue(np.allclose(errors[0], direct, rtol=0.05))
+
+    def test_sampling_modes(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        r = sim_season(2022, start_date, 51, seed=1, sampling="antithetic", elo_file=elo_file)
+        self.assertEqual(r.epochs, 52)
+        self.assertEqual(sum(r.teams_to_playoffs.values()), 52 * 14)
+        self.assertIn("sb", next(iter(r.standard_errors().values())))
+
+    def test_common_random_numbers(self):
+        # a game shared by two start dates gets the same draw with crn=True
+        early = Season(2022, datetime(year=2022, month=11, day=1), elo_file).schedule
+        late = Season(2022, datetime(year=2022, month=12, day=1), elo_file).schedule
+        shared = np.flatnonzero(np.isin(early.season_index, late.season_index))
+        self.assertEqual(len(shared), late.num_games)
+        self.assertTrue((early.season_index[shared] == late.season_index).all())
+        u_early = early.draw(30, np.random.default_rng(2), crn=True)
+        u_late = late.draw(30, np.random.default_rng(2), crn=True)
+        self.assertTrue((u_early[:, shared] == u_late).all())
+        # without crn the draws follow the position in the remaining games
+        u_early = early.draw(30, np.random.default_rng(2))
+        u_late = late.draw(30, np.random.default_rng(2))
+        self.assertFalse((u_early[:, shared] == u_late).any())
+
+class TestAdaptiveEpochs(unittest.TestCase):
+    def test_stops_at_target(self):
+        start_date = datetime(year=2023, month=1, day=10)
+        results = sim_season(2022, start_date, 20000, seed=0, chunk_size=500, target_se=0.01, elo_file=elo_file)
+        self.assertLess(results.epochs, 20000)
+        self.assertEqual(results.epochs % 500, 0)
+        self.assertLessEqual(results.max_std_error(), 0.01)
+
+    def test_cap(self):
+        start_date = datetime(year=2022, month=9, day=1)
+        results = sim_season(2022, start_date, 600, seed=0, chunk_size=200, target_se=0.001, elo_file=elo_file)
+        self.assertEqual(results.epochs, 600)
+        self.assertGreater(results.max_std_error(), 0.001)
+
+class TestExactPlayoffs(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        league_info = LeagueInfo("team_info.csv")
+        self.standings = Standings(league_info, load_elo(elo_file))
+        teams = self.standings.team_list
+        for i, team in enumerate(teams):
+            self.standings.update_elo(team.abb, 1350 + 10 * i)
+        self.afc = [t for t in teams if t.conf == "AFC"][:7]
+        self.nfc = [t for t in teams if t.conf == "NFC"][:7]
+
+    def test_matches_sampling(self):
+        odds = playoff_odds(self.afc, self.nfc)
+        self.assertAlmostEqual(sum(odds.values()), 1)
+        rng = random.Random(0)
+        n = 40000
+        counts = {}
+        for _ in range(n):
+            champ = sim_playoffs(self.afc, self.nfc, rng)
+            counts[champ.name] = counts.get(champ.name, 0) + 1
+        for name, p in odds.items():
+            self.assertLess(abs(counts.get(name, 0) / n - p), 4 * (p * (1 - p) / n) ** 0.5 + 1e-9)
+
+    def test_win_matrix(self):
+        matrix = self.standings.win_matrix()
+        self.assertEqual(matrix.shape, (32, 32))
+        self.assertTrue(np.allclose(matrix + matrix.T, 1))
+        a, b = self.afc[0], self.nfc[0]
+        self.assertEqual(matrix[a.id, b.id], 1 / (10 ** (-(a.playoff_elo - b.playoff_elo) / 400) + 1))
+        abbs, loaded = load_win_matrix(2022, datetime(year=2022, month=12, day=1), elo_file)
+        self.assertEqual(abbs, self.standings.league_info.abbs)
+        self.assertTrue(np.allclose(loaded + loaded.T, 1))
+
+    def test_batch_matches_scalar(self):
+        rng = np.random.default_rng(0)
+        teams = self.standings.team_list
+        afc_ids = [t.id for t in teams if t.conf == "AFC"]
+        nfc_ids = [t.id for t in teams if t.conf == "NFC"]
+        afc = np.array([rng.permutation(afc_ids)[:7] for _ in range(300)])
+        nfc = np.array([rng.permutation(nfc_ids)[:7] for _ in range(300)])
+        draws = rng.random((300, num_playoff_games))
+        champs = sim_playoffs_batch(self.standings.win_matrix(), afc, nfc, draws)
+        for e in range(300):
+            champ = sim_playoffs([teams[i] for i in afc[e]], [teams[i] for i in nfc[e]], PresetDraws(draws[e].tolist()))
+            self.assertEqual(champ.id, champs[e])
+
+    def test_batch_per_epoch_matrices(self):
+        rng = np.random.default_rng(1)
+        elos = 1500 + 100 * rng.standard_normal((50, 32))
+        teams = self.standings.team_list
+        afc = np.tile([t.id for t in self.afc], (50, 1))
+        nfc = np.tile([t.id for t in self.nfc], (50, 1))
+        draws = rng.random((50, num_playoff_games))
+        champs = sim_playoffs_batch(win_matrix(elos), afc, nfc, draws)
+        for e in range(50):
+            self.assertEqual(champs[e], sim_playoffs_batch(win_matrix(elos[e]), afc[e:e + 1], nfc[e:e + 1], draws[e:e + 1])[0])
+
+    def test_round_odds_match_sampling(self):
+        odds = playoff_round_odds(self.afc, self.nfc)
+        self.assertEqual(odds.shape, (14, len(round_names)))
+        self.assertTrue(np.allclose(odds.sum(axis=0), [8, 4, 2, 1]))
+        n = 40000
+        afc = np.tile([t.id for t in self.afc], (n, 1))
+        nfc = np.tile([t.id for t in self.nfc], (n, 1))
+        draws = np.random.default_rng(2).random((n, num_playoff_games))
+        reached = sim_playoffs_batch(self.standings.win_matrix(), afc, nfc, draws, rounds=True)[1]
+        self.assertTrue((reached.sum(axis=1) == [8, 4, 2, 1]).all())
+        self.assertLess(np.abs(reached.mean(axis=0) - odds).max(), 0.015)
+
+    def test_cache(self):
+        cache = {}
+        self.assertEqual(playoff_odds(self.afc, self.nfc, cache), playoff_odds(self.afc, self.nfc))
+        self.assertEqual(len(cache), 2)
+
+    def test_exact_season(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        results = sim_season(2022, start_date, 200, seed=0, playoffs="exact", elo_file=elo_file)
+        self.assertAlmostEqual(sum(results.teams_to_sbs.values()), 200)
+        sampled = sim_season(2022, start_date, 200, seed=0, elo_file=elo_file)
+        # same seasons, so only the Super Bowl odds lose their playoff noise
+        self.assertEqual(results.teams_to_playoffs, sampled.teams_to_playoffs)
+        exact_se = max(e["sb"] for e in results.standard_errors().values())
+        sampled_se = max(e["sb"] for e in sampled.standard_errors().values())
+        self.assertLess(exact_se, sampled_se)
+
+class TestOutcomeCounts(unittest.TestCase):
+    def test_counts(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        season = Season(2022, start_date, elo_file)
+        results = sim_season(2022, start_date, 300, seed=6, chunk_size=100, season=season, elo_file=elo_file)
+        # every team is counted once per epoch in the seed histogram
+        self.assertTrue((results.seeds.sum(axis=1) == 300).all())
+        self.assertTrue((results.seeds[:, :7].sum(axis=0) == 2 * 300).all())
+        self.assertEqual(results.division_titles.sum(), 8 * 300)
+        self.assertTrue(np.allclose(results.rounds.sum(axis=0), [8 * 300, 4 * 300, 2 * 300, 300]))
+        self.assertTrue((results.rounds[:, 0] <= results.playoff_counts).all())
+        self.assertTrue((np.diff(results.rounds, axis=1) <= 0).all())
+        # win totals add up to the games already won plus one per remaining game
+        wins = (results.win_totals * np.arange(results.win_totals.shape[1])).sum()
+        self.assertEqual(wins, 300 * (season.baseline.wins.sum() + season.schedule.num_games))
+        exact = sim_season(2022, start_date, 300, seed=6, chunk_size=100, season=season, playoffs="exact", elo_file=elo_file)
+        self.assertTrue((exact.seeds == results.seeds).all())
+        self.assertTrue((exact.win_totals == results.win_totals).all())
+        self.assertTrue(np.allclose(exact.rounds.sum(axis=0), [8 * 300, 4 * 300, 2 * 300, 300]))
+
+    def test_win_totals(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        season = Season(2022, start_date, elo_file)
+        outcomes = season.schedule.sim_outcomes(5, np.random.default_rng(0))
+        totals = season.schedule.win_totals(outcomes, season.baseline.wins)
+        standings = season.standings()
+        for e in range(5):
+            standings.add_results(season.schedule.t1, season.schedule.t2, outcomes[e], season.schedule.played)
+            self.assertTrue((totals[e] == standings.wins).all())
+            standings.reset()
+
+    def test_table_repr(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        results = sim_season(2022, start_date, 100, seed=6, elo_file=elo_file)
+        table = results.table_repr()
+        self.assertEqual(len(table), 32)
+        row = table[0]
+        self.assertEqual(len(row["seed_percentages"]), 8)
+        self.assertAlmostEqual(sum(row["seed_percentages"]), 100)
+        self.assertAlmostEqual(sum(row["win_total_percentages"]), 100)
+        self.assertEqual(row["win_percentage"], max(r["win_percentage"] for r in table))
+        self.assertGreaterEqual(row["playoff_percentage"], row["divisional_percentage"])
+        self.assertGreaterEqual(row["super_bowl_percentage"], row["win_percentage"])
+
+class TestIterSeason(unittest.TestCase):
+    def setUp(self):
+        self.start_date = datetime(year=2022, month=12, day=1)
+
+    def test_snapshots(self):
+        snapshots = list(iter_season(2022, self.start_date, 1000, every=400, chunk_size=200, seed=5, elo_file=elo_file))
+        self.assertEqual([s.epochs for s in snapshots], [400, 800, 1000])
+        final = sim_season(2022, self.start_date, 1000, chunk_size=200, seed=5, elo_file=elo_file)
+        self.assertEqual(snapshots[-1].teams_to_sbs, final.teams_to_sbs)
+        self.assertEqual(snapshots[-1].standard_errors(), final.standard_errors())
+        # earlier snapshots don't change as the run goes on
+        self.assertEqual(sum(snapshots[0].teams_to_sbs.values()), 400)
+        with self.assertRaises(TypeError):
+            snapshots[0].add_chunk(np.zeros((1, 7), int), np.zeros((1, 7), int), np.zeros((1, 14, 4)), np.zeros((1, 32), int))
+        with self.assertRaises(TypeError):
+            snapshots[0].merge(final)
+
+    def test_cancel(self):
+        snapshots = iter_season(2022, self.start_date, 100000, chunk_size=100, seed=5, elo_file=elo_file)
+        for snapshot in snapshots:
+            if snapshot.epochs >= 300:
+                break
+        snapshots.close()
+        self.assertEqual(snapshot.epochs, 300)
+
+    def test_progress(self):
+        seen = []
+        sim_season(2022, self.start_date, 250, chunk_size=100, seed=5, elo_file=elo_file,
+                   progress=lambda results, epochs: seen.append((results.epochs, epochs)))
+        self.assertEqual(seen, [(100, 250), (200, 250), (250, 250)])
+        with self.assertRaises(ValueError):
+            sim_season(2022, self.start_date, 250, workers=2, progress=print_progress, elo_file=elo_file)
+
+class TestParallel(unittest.TestCase):
+    def test_merge(self):
+        names = ["KANSAS CITY CHIEFS", "BUFFALO BILLS", "DALLAS COWBOYS"]
+        a = PlayoffResults(names)
+        a.rounds[:, -1] = [3, 1, 0]
+        a.epochs = 4
+        b = PlayoffResults(names)
+        b.rounds[:, -1] = [2, 0, 4]
+        b.win_totals = np.zeros((3, 20), dtype=np.int64)
+        b.win_totals[0, 19] = 6
+        b.epochs = 6
+        a.merge(b)
+        self.assertEqual(a.epochs, 10)
+        self.assertEqual(a.teams_to_sbs, {"KANSAS CITY CHIEFS": 5, "BUFFALO BILLS": 1, "DALLAS COWBOYS": 4})
+        self.assertEqual(a.win_totals.shape, (3, 20))
+        self.assertEqual(a.win_totals[0, 19], 6)
+
+    def test_reproducible(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        runs = [sim_season(2022, start_date, 50, seed=7, workers=w, elo_file=elo_file) for w in [1, 1, 2, 2]]
+        self.assertEqual(runs[0].teams_to_sbs, runs[1].teams_to_sbs)
+        self.assertEqual(runs[2].teams_to_sbs, runs[3].teams_to_sbs)
+        self.assertEqual(runs[2].epochs, 50)
+
+class TestSeasonCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.elo_file = os.path.join(self.dir, "elo.csv")
+        self.info_file = os.path.join(self.dir, "team_info.csv")
+        shutil.copy(elo_file, self.elo_file)
+        shutil.copy("team_info.csv", self.info_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_hits_and_eviction(self):
+        cache = SeasonCache(maxsize=2, elo_file=self.elo_file, info_file=self.info_file)
+        dates = [datetime(year=2022, month=m, day=1) for m in (10, 11, 12)]
+        first = cache.get(2022, dates[0])
+        self.assertIs(cache.get(2022, dates[0]), first)
+        cache.get(2022, dates[1])
+        cache.get(2022, dates[2])
+        self.assertIsNot(cache.get(2022, dates[0]), first)
+        info = cache.cache_info()
+        self.assertEqual((info["hits"], info["misses"], info["currsize"]), (1, 4, 2))
+        self.assertAlmostEqual(info["hit_rate"], 0.2)
+
+    def test_invalidated_by_file_change(self):
+        cache = SeasonCache(elo_file=self.elo_file, info_file=self.info_file)
+        start_date = datetime(year=2022, month=12, day=1)
+        first = cache.get(2022, start_date)
+        stat = os.stat(self.info_file)
+        os.utime(self.info_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIsNot(cache.get(2022, start_date), first)
+        self.assertEqual(cache.cache_info()["invalidations"], 1)
+
+    def test_cached_season_runs(self):
+        start_date = datetime(year=2022, month=12, day=1)
+        season = Season(2022, start_date, elo_file)
+        r1 = sim_season(2022, start_date, 50, seed=4, season=season, elo_file=elo_file)
+        r2 = sim_season(2022, start_date, 50, seed=4, season=season, elo_file=elo_file)
+        r3 = sim_season(2022, start_date, 50, seed=4, elo_file=elo_file)
+        self.assertEqual(r1.teams_to_sbs, r2.teams_to_sbs)
+        self.assertEqual(r1.teams_to_sbs, r3.teams_to_sbs)
+        # runs work on copies, the shared baseline is untouched
+        standings = season.standings()
+        self.assertTrue((standings.wins == season.baseline.wins).all())
+        standings.wins += 1
+        self.assertFalse((standings.wins == season.baseline.wins).any())
+
+class TestStandings(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.leagueInfo = LeagueInfo("team_info.csv")
+        self.elo = load_elo(elo_file)
+
+    def test_records_match_results(self):
+        standings = Standings(self.leagueInfo, self.elo)
+        for abb, team in standings.teams.items():
+            played = self.elo[(self.elo["team1"] == abb) | (self.elo["team2"] == abb)]
+            self.assertEqual(team.wins + team.losses + team.ties, played.shape[0])
+            self.assertEqual(standings.played[team.id].sum(), played.shape[0])
+        # wins over each opponent add back up to the win totals
+        self.assertTrue((standings.h2h.sum(axis=1) == standings.wins).all())
+        self.assertTrue((standings.h2h.sum(axis=0) == standings.losses).all())
+
+    def test_ingest_matches_add_result(self):
+        past = self.elo.iloc[:40].copy()
+        past.loc[past.index[0], "score2"] = past.loc[past.index[0], "score1"]
+        past.loc[past.index[1], "score1"] = np.nan
+        bulk = Standings(self.leagueInfo, past)
+        single = Standings(self.leagueInfo, self.elo.iloc[:0])
+        for t1, t2, s1, s2 in zip(past["team1"], past["team2"], past["score1"], past["score2"]):
+            single.add_result(t1.upper(), t2.upper(), Result.T1WIN if s1 > s2 else Result.T1LOSS if s2 > s1 else Result.TIE)
+        for attr in ["wins", "losses", "ties", "h2h", "played"]:
+            self.assertTrue((getattr(bulk, attr) == getattr(single, attr)).all(), attr)
+        self.assertGreaterEqual(bulk.ties.sum(), 4)
+
+    def test_last_elos(self):
+        standings = Standings(self.leagueInfo, self.elo)
+        get_last_elos(standings, self.elo)
+        last = self.elo[self.elo["dateObject"] == self.elo["dateObject"].max()].iloc[0]
+        self.assertEqual(standings.teams[last["team1"]].playoff_elo, last["elo1_pre"])
+        self.assertEqual(standings.teams[last["team2"]].playoff_elo, last["elo2_pre"])
+
+    def test_add_result(self):
+        standings = Standings(self.leagueInfo, self.elo.iloc[:0])
+        standings.add_result("KC", "BUF", Result.T1WIN)
+        standings.add_result("BUF", "KC", Result.TIE)
+        kc = standings.teams["KC"]
+        buf = standings.teams["BUF"]
+        self.assertEqual((kc.wins, kc.losses, kc.ties), (1, 0, 1))
+        self.assertEqual((buf.wins, buf.losses, buf.ties), (0, 1, 1))
+        self.assertEqual(kc.wlt, 0.75)
+        self.assertEqual(standings.record_vs(kc.id, [buf.id]), 1.5)
+        self.assertEqual(standings.record_vs(buf.id, [kc.id]), 0.5)
+        self.assertTrue(kc > buf)
+
+    def test_reset_is_bounded(self):
+        # memory and per-epoch time must not grow with the epoch count
+        start_date = datetime(year=2022, month=10, day=1)
+        past_results = self.elo[self.elo["dateObject"] < start_date]
+        schedule = Schedule(self.leagueInfo, self.elo[self.elo["dateObject"] >= start_date])
+        standings = Standings(self.leagueInfo, past_results)
+        base_wins = standings.wins.copy()
+        base_h2h = standings.h2h.copy()
+        wins = standings.wins
+        outcomes = schedule.sim_outcomes(2, np.random.default_rng(0))
+
+        block = 1000
+        times = []
+        tracemalloc.start()
+        for e in range(100000):
+            if e % block == 0:
+                times.append(time.perf_counter())
+                if e == block:
+                    mem_start = tracemalloc.get_traced_memory()[0]
+            standings.add_results(schedule.t1, schedule.t2, outcomes[e % 2], schedule.played)
+            standings.wlt()
+            standings.reset()
+        mem_end = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        times.append(time.perf_counter())
+
+        self.assertLess(mem_end - mem_start, 10000)
+        block_times = np.diff(times)
+        self.assertLess(np.median(block_times[-10:]), 2 * np.median(block_times[1:11]))
+        # records went back to the baseline in the same buffers
+        self.assertIs(standings.wins, wins)
+        self.assertTrue((standings.wins == base_wins).all())
+        self.assertTrue((standings.h2h == base_h2h).all())
+
+if __name__ == '__main__':
+    unittest.main()
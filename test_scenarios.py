@@ -0,0 +1,109 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from nflsim import Season, sim_season
+from scenarios import SampleBank, WhatIf
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestSampleBank(unittest.TestCase):
+    def test_outcomes_round_trip(self):
+        rng = np.random.default_rng(0)
+        bank = SampleBank()
+        chunks = [rng.random((n, 21)) < 0.5 for n in (5, 7)]
+        for outcomes in chunks:
+            ids = np.zeros((len(outcomes), 7), dtype=np.intp)
+            bank.add(outcomes, ids, ids, np.zeros((len(outcomes), 14, 4)), np.zeros((len(outcomes), 32), dtype=np.intp), None)
+        self.assertEqual(bank.epochs, 12)
+        games = [0, 7, 8, 20]
+        self.assertTrue((bank.outcomes(games) == np.concatenate(chunks)[:, games]).all())
+
+class TestWhatIf(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.start_date = datetime(year=2022, month=12, day=1)
+        self.season = Season(2022, self.start_date, elo_file)
+        self.what_if = WhatIf(2022, self.start_date, 4000, min_ess=500, seed=2, chunk_size=500, season=self.season,
+                              elo_file=elo_file)
+
+    def test_no_pins(self):
+        results = self.what_if.odds({})
+        base = self.what_if.results
+        self.assertEqual(results.epochs, base.epochs)
+        self.assertTrue((results.seeds == base.seeds).all())
+        self.assertTrue((results.win_totals == base.win_totals).all())
+        self.assertEqual(results.teams_to_sbs, base.teams_to_sbs)
+
+    def test_pinned_result(self):
+        game = self.what_if.games()[0]
+        results = self.what_if.odds({0: game["team2"]})
+        self.assertTrue(results.weighted)
+        outcomes = self.what_if.bank.outcomes([0])[:, 0]
+        self.assertEqual(results.epochs, np.count_nonzero(~outcomes))
+        self.assertEqual(results.samples(), results.epochs)
+        self.assertTrue((results.seeds.sum(axis=1) == results.epochs).all())
+        # the same as pinning the odds to certain
+        certain = self.what_if.odds({"0": 0.0})
+        self.assertTrue(np.allclose(certain.rounds, results.rounds))
+        # and close to simulating the pinned season
+        resim = self.what_if.resimulate(self.what_if.check_pins({0: False}))
+        self.assertFalse(resim.weighted)
+        diff = np.abs(results.playoff_counts / results.epochs - resim.playoff_counts / resim.epochs)
+        self.assertLess(diff.max(), 0.05)
+
+    def test_pinned_odds(self):
+        results = self.what_if.odds({0: 0.5})
+        self.assertAlmostEqual(results.epochs, self.what_if.bank.epochs)
+        self.assertLess(results.samples(), results.epochs)
+        self.assertTrue(np.allclose(results.rounds.sum(axis=0), [8, 4, 2, 1] * np.array(results.epochs)))
+
+    def test_resimulates_when_too_few_agree(self):
+        games = self.what_if.games()
+        pins = {g["game"]: g["team1"] for g in games[:8]}
+        results = self.what_if.odds(pins)
+        self.assertFalse(results.weighted)
+        self.assertEqual(results.epochs, 4000)
+        self.assertIs(self.what_if.odds(pins), results)
+        # without resimulating, only a cached run answers
+        other = {g["game"]: g["team2"] for g in games[:8]}
+        self.assertIsNone(self.what_if.odds(other, resimulate=False))
+        self.assertIs(self.what_if.odds(pins, resimulate=False), results)
+        # every resimulated season went the pinned way
+        schedule = self.season.pinned(self.what_if.check_pins(pins)).schedule
+        outcomes = schedule.sim_outcomes(100, np.random.default_rng(0))
+        self.assertTrue(outcomes[:, :8].all())
+        self.assertFalse(outcomes[:, 8:].all())
+
+    def test_leverage(self):
+        games = self.what_if.leverage()
+        self.assertEqual(len(games), self.season.schedule.num_games)
+        swings = [game["playoff_swing"] for game in games]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        self.assertGreater(swings[0], 0)
+        # the conditional odds are those of the epochs with that result
+        top = games[0]
+        team = top["teams"][0]
+        i = self.what_if.names.index(team["team_name"])
+        for pin, key in ((True, "playoffs_if_team1"), (False, "playoffs_if_team2")):
+            pins = self.what_if.check_pins({top["game"]: pin})
+            results = self.what_if.bank.results(self.what_if.names, self.what_if.weights(pins))
+            self.assertAlmostEqual(results.playoff_counts[i] / results.epochs * 100, team[key], delta=0.006)
+        self.assertEqual(top["samples_if_team1"] + top["samples_if_team2"], 4000)
+        self.assertEqual(len(self.what_if.leverage(top=5)), 5)
+
+    def test_bad_pins(self):
+        game = self.what_if.games()[0]
+        other = next(abb for abb in self.season.league_info.abbs if abb not in (game["team1"], game["team2"]))
+        for pins in ({0: other}, {10000: True}, {0: 1.5}, {"x": True}, {0: None}, [0], 3):
+            with self.assertRaises(ValueError):
+                self.what_if.odds(pins)
+
+    def test_reference_engine_rejects_pins(self):
+        with self.assertRaises(ValueError):
+            sim_season(2022, self.start_date, 2, engine="reference", season=self.season.pinned({0: True}),
+                       elo_file=elo_file)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from nflsim import Season, sim_season
+from simstats import SimStats, phase_names
+
+elo_file = "nfl_elo_22-23.csv"
+
+class TestSimStats(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.start_date = datetime(year=2022, month=12, day=1)
+        self.season = Season(2022, self.start_date, elo_file)
+
+    def test_count_pairs(self):
+        stats = SimStats()
+        same_div = np.array([True, True, False, False, False])
+        # decided by step 0, step 2, coin, step 1, coin
+        steps = [np.array([1, 0, 0, 0, 0]), np.array([0, 0, 0, -1, 0]), np.array([0, 2, 0, 0, 0]),
+                 np.array([0, 0, 0, 0, 0])]
+        stats.count_pairs(same_div, steps)
+        self.assertEqual(stats.reached[1], 5)
+        self.assertEqual(stats.resolved[1], 1)
+        # division pairs go 1, 2, 3, 4, 5 and wild card pairs 1, 4, 3, 5
+        self.assertEqual((stats.reached[2], stats.resolved[2]), (1, 0))
+        self.assertEqual((stats.reached[3], stats.resolved[3]), (3, 1))
+        self.assertEqual((stats.reached[4], stats.resolved[4]), (3, 1))
+        self.assertEqual(stats.coin_flips, 1 + 1)
+
+    def test_same_results(self):
+        for engine, epochs in (("vectorized", 2000), ("reference", 40)):
+            off = sim_season(2022, self.start_date, epochs, engine=engine, seed=3, chunk_size=500, season=self.season,
+                             elo_file=elo_file)
+            on = sim_season(2022, self.start_date, epochs, engine=engine, seed=3, chunk_size=500, season=self.season,
+                            stats=True, elo_file=elo_file)
+            self.assertIsNone(off.stats)
+            self.assertTrue((off.seeds == on.seeds).all())
+            self.assertTrue((off.rounds == on.rounds).all())
+            stats = on.stats
+            self.assertEqual(stats.epochs, epochs)
+            self.assertEqual(sorted(stats.phases), sorted(phase_names))
+            self.assertTrue(all(t > 0 for t in stats.phases.values()))
+            self.assertLessEqual(stats.phases["wildcards"], stats.phases["seeding"])
+            self.assertGreater(stats.reached[1], 0)
+            self.assertTrue(all(r <= n for r, n in zip(stats.resolved, stats.reached)))
+            self.assertEqual(stats.reached[5], stats.resolved[5])
+            self.assertEqual(stats.as_dict()["coin_flips"], stats.reached[5] + stats.reached[10])
+
+    def test_workers_and_snapshots(self):
+        results = sim_season(2022, self.start_date, 2000, seed=3, workers=2, season=self.season, stats=True,
+                             elo_file=elo_file)
+        self.assertEqual(results.stats.epochs, 2000)
+        snapshot = results.snapshot()
+        self.assertIsNot(snapshot.stats, results.stats)
+        self.assertEqual(snapshot.stats.as_dict(), results.stats.as_dict())
+
+if __name__ == '__main__':
+    unittest.main()
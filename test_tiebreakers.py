@@ -1,46 +1,116 @@
+import os
 import unittest
 
 from tiebreakers import *
 from nflsim import *
+import backtest
 
-elo_file = ""
+elo_file = "nfl_elo.csv"
+# the regular season rows of backtest_file's seasons, with only the columns the backtest reads
+backtest_file = "backtest_elo.csv"
 
-# Test a specific year, grabbing actual standings and playoff seeds
-# and comparing to my tiebreaker simulation's playoff seeds
+# Seeds the final standings of past seasons and compares them to the actual
+# playoff seeds in backtest.seeds_file
 class TestTiebreakers(unittest.TestCase):
+    def test_getplayoffseeds(self):
+        # the 2022 season in the bundled elo file
+        seeds = {key: value for key, value in backtest.load_seeds().items() if key[0] == 2022}
+        seeded = backtest.run([2022], elo_file="nfl_elo_22-23.csv", seeds=seeds)
+        self.assertEqual(backtest.diff(seeded, seeds), [])
+
+    def check_history(self, elo_file, years=None):
+        seeds = backtest.load_seeds()
+        if years is not None:
+            seeds = {key: value for key, value in seeds.items() if key[0] in years}
+        seeded = backtest.run(workers=4, elo_file=elo_file, seeds=seeds)
+        self.assertEqual(sorted(seeded), sorted({season for season, _ in seeds}))
+        # tiebreakers past common games (strength of victory / schedule and
+        # net points) aren't implemented and fall to a coin flip, so only
+        # seasons seeded without one have to match
+        decided = [(m["season"], m["conf"], m["actual"], m["simulated"])
+                   for m in backtest.diff(seeded, seeds) if not m["coin_flip"]]
+        self.assertEqual(decided, [])
+
+    def test_history(self):
+        # the seasons in the checked-in backtest_file
+        self.check_history(backtest_file, years=set(load_elo(backtest_file)["season"]))
+
+    @unittest.skipUnless(os.path.exists(elo_file), elo_file + " isn't checked in")
+    def test_full_history(self):
+        self.check_history(elo_file)
+
+class TestTiebreakerTables(unittest.TestCase):
     @classmethod
     def setUpClass(self):
         self.leagueInfo = LeagueInfo("team_info.csv")
-        self.tiebreakers = Tiebreakers(self.leagueInfo.abbs_to_codes, self.leagueInfo.team_info)
-        # set up standings (team_info, past_results)
-        # team_info initialize here
-        # past_results load here for specific year
-        
-    def test_getplayoffseeds(self):
-        # manually check these years against wikipedia
-        for year in range(2002, 2023):
-            start_date = datetime.now() # use today's date to stay current
-            elo = pd.read_csv("nfl_elo.csv")
-            elo = elo[elo["playoff"].isna()]
-            elo["dateObject"] = elo["date"].apply((lambda x: datetime.strptime(x, "%Y-%m-%d")))
-            elo = elo[elo["season"] == year]
-            past_results = elo[elo["dateObject"] < start_date]
-            # print(past_results)
-            rem_games = elo[elo["dateObject"] >= start_date]
-            self.assertTrue(rem_games.empty)
-            
-            standings = Standings(self.leagueInfo, past_results)
-            get_last_elos(standings, past_results)
-
-            my_output = self.tiebreakers.get_playoff_seeds(standings)
-            my_afc = str(my_output[0])
-            my_nfc = str(my_output[1])
-
-            print("Year: ", str(year))
-            print(my_afc)
-            print(my_nfc)
-            print()
-        
+        self.tiebreakers = Tiebreakers(self.leagueInfo.team_info)
+
+    def test_masks(self):
+        ids = self.tiebreakers.ids
+        self.assertEqual(list(ids), self.leagueInfo.abbs)
+        self.assertEqual(self.tiebreakers.div_mask.sum(), 32 * 4)
+        self.assertEqual(self.tiebreakers.conf_mask.sum(), 32 * 16)
+        self.assertTrue(self.tiebreakers.div_mask[ids["KC"], ids["LAC"]])
+        self.assertFalse(self.tiebreakers.div_mask[ids["KC"], ids["BUF"]])
+        self.assertTrue(self.tiebreakers.conf_mask[ids["KC"], ids["BUF"]])
+        self.assertFalse(self.tiebreakers.conf_mask[ids["KC"], ids["DAL"]])
+
+    def test_div_and_conf_record(self):
+        standings = Standings(self.leagueInfo, load_elo("nfl_elo_22-23.csv").iloc[:0])
+        standings.add_result("KC", "LAC", Result.T1WIN)
+        standings.add_result("KC", "BUF", Result.T1LOSS)
+        standings.add_result("KC", "DAL", Result.TIE)
+        kc = standings.teams["KC"]
+        self.assertEqual(self.tiebreakers.div_record(kc), 1)
+        self.assertEqual(self.tiebreakers.conf_record(kc), 1)
+        self.assertEqual(standings.record_vs(kc.id, standings.opponents(kc.id)), 1.5)
+
+class TestTiebreakerCache(unittest.TestCase):
+    def test_cache_matches_uncached(self):
+        leagueInfo = LeagueInfo("team_info.csv")
+        elo = load_elo("nfl_elo_22-23.csv")
+        start_date = datetime(year=2022, month=12, day=20)
+        standings = Standings(leagueInfo, elo[elo["dateObject"] < start_date])
+        schedule = Schedule(leagueInfo, elo[elo["dateObject"] >= start_date])
+        outcomes = schedule.sim_outcomes(300, np.random.default_rng(0))
+        seeds = []
+        for cache_size in [0, 64]:
+            tiebreakers = Tiebreakers(leagueInfo.team_info, cache_size=cache_size)
+            random.seed(0)
+            run = []
+            for row in outcomes:
+                standings.add_results(schedule.t1, schedule.t2, row, schedule.played)
+                afc, nfc = tiebreakers.get_playoff_seeds(standings)
+                run.append([t.abb for t in afc + nfc])
+                standings.reset()
+            seeds.append(run)
+        self.assertEqual(seeds[0], seeds[1])
+        info = tiebreakers.cache_info()
+        self.assertGreater(info["hits"], 0)
+        self.assertLessEqual(info["currsize"], 64)
+
+class TestBatchSeeding(unittest.TestCase):
+    def test_batch_matches_scalar(self):
+        leagueInfo = LeagueInfo("team_info.csv")
+        elo = load_elo("nfl_elo_22-23.csv")
+        tiebreakers = Tiebreakers(leagueInfo.team_info)
+        for start_date in [datetime(year=2022, month=10, day=1), datetime(year=2022, month=12, day=20)]:
+            standings = Standings(leagueInfo, elo[elo["dateObject"] < start_date])
+            schedule = Schedule(leagueInfo, elo[elo["dateObject"] >= start_date])
+            outcomes = schedule.sim_outcomes(300, np.random.default_rng(1))
+            afc, nfc = tiebreakers.get_playoff_seeds_batch(standings, schedule, outcomes)
+            self.assertEqual(afc.shape, (300, 7))
+            self.assertLess(tiebreakers.batch_fallbacks, 300)
+            for e, row in enumerate(outcomes):
+                standings.add_results(schedule.t1, schedule.t2, row, schedule.played)
+                tiebreakers.coin_flipped = False
+                scalar_afc, scalar_nfc = tiebreakers.get_playoff_seeds(standings)
+                standings.reset()
+                # coin flips draw differently in the two paths
+                if tiebreakers.coin_flipped:
+                    continue
+                self.assertEqual([t.id for t in scalar_afc], afc[e].tolist())
+                self.assertEqual([t.id for t in scalar_nfc], nfc[e].tolist())
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,4 +1,6 @@
 import random
+import numpy as np
+from collections import OrderedDict
 from enum import Enum
 
 class Result(Enum):
@@ -6,36 +8,102 @@ class Result(Enum):
     T1LOSS = 1
     TIE = 2
 
+# Records used by the batch seeding, indexed [epoch, team(, team)] except
+# opps, the constant mask of who plays whom
+class BatchRecords:
+    __slots__ = ("h2h", "pts", "div_rec", "conf_rec", "opps")
+    def __init__(self, h2h, pts, div_rec, conf_rec, opps):
+        self.h2h = h2h
+        self.pts = pts
+        self.div_rec = div_rec
+        self.conf_rec = conf_rec
+        self.opps = opps
+
 class Tiebreakers:
-    def __init__(self, team_info):
+    def __init__(self, team_info, cache_size=4096, rng=random):
         self.team_info = team_info
+        # source of coin flips, a random.Random (or the random module)
+        self.rng = rng
+        # Integer tables built once from team_info, in the same team id order
+        # as LeagueInfo / Standings
+        self.ids = {abb: i for i, abb in enumerate(team_info)}
+        divs = [team_info[abb]["DIV"] for abb in team_info]
+        self.div_names = list(dict.fromkeys(divs))
+        self.conf_names = list(dict.fromkeys(div.split(" ")[0] for div in divs))
+        self.div_ids = np.array([self.div_names.index(div) for div in divs])
+        self.conf_ids = np.array([self.conf_names.index(div.split(" ")[0]) for div in divs])
+        # div_mask[i, j] / conf_mask[i, j] are True when j is in i's division / conference
+        self.div_mask = self.div_ids[:, None] == self.div_ids[None, :]
+        self.conf_mask = self.conf_ids[:, None] == self.conf_ids[None, :]
+        # LRU cache of resolved ties, shared by every epoch of a run
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coin_flipped = False
+        # a simstats.SimStats when instrumented
+        self.stats = None
 
-    def wins_from_game(self, game, team):
-        if self.is_team1(game, team):
-            if game.result == Result.T1WIN:
-                return 1
-            elif game.result == Result.T1LOSS:
-                return 0
-            else:
-                return 0.5
-        else:
-            if game.result == Result.T1WIN:
-                return 0
-            elif game.result == Result.T1LOSS:
-                return 1
-            else:
-                return 0.5
+    # Returns the winner of a tie between teams, from the cache if the same
+    # teams were tied before with the same results. The key holds the tied
+    # team ids plus their h2h rows / columns and played rows, which is
+    # everything the tiebreakers read (records, division, conference and
+    # common games). Resolutions that reached a coin flip are never stored
+    def memoized(self, kind, teams, resolve):
+        if self.cache_size == 0:
+            return resolve()
+        standings = teams[0].standings
+        ids = [t.id for t in teams]
+        key = (kind, tuple(ids), standings.h2h[ids].tobytes(), standings.h2h[:, ids].tobytes(), standings.played[ids].tobytes())
+        winner = self.cache.get(key)
+        if winner is not None:
+            self.cache.move_to_end(key)
+            self.cache_hits += 1
+            return teams[ids.index(winner)]
+        self.cache_misses += 1
+        outer_flipped = self.coin_flipped
+        self.coin_flipped = False
+        result = resolve()
+        if not self.coin_flipped and result is not None:
+            self.cache[key] = result.id
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        self.coin_flipped = outer_flipped or self.coin_flipped
+        return result
+
+    # Counts every tiebreakerN call and the batch two-team ties into stats (a
+    # simstats.SimStats) and times wild card resolution. Only this instance's
+    # methods are wrapped, an uninstrumented Tiebreakers runs as before
+    def instrument(self, stats):
+        self.stats = stats
+        for k in range(1, 12):
+            name = "tiebreaker" + str(k)
+            setattr(self, name, stats.counted(k, getattr(self, name)))
+        self.get_wildcards = stats.timed("wildcards", self.get_wildcards)
+        self.pick_wildcards = stats.timed("wildcards", self.pick_wildcards)
+
+    def cache_info(self):
+        return {"hits": self.cache_hits, "misses": self.cache_misses, "maxsize": self.cache_size, "currsize": len(self.cache)}
+
+    def div_record(self, team):
+        return team.standings.record_vs(team.id, self.div_mask[team.id])
 
-    def is_team1(self, game, team):
-        return team.abb == game.t1abb
+    def conf_record(self, team):
+        return team.standings.record_vs(team.id, self.conf_mask[team.id])
 
     def find_team(self, teams, team):
         for i in range(len(teams)):
             if teams[i].same(team):
                 return i
 
-    def get_opp(self, game, team):
-        return game.t2abb if self.is_team1(game, team) else game.t1abb
+    # the team of div that has clinched it, if any
+    def clinched_champ(self, div, clinches):
+        if clinches is None:
+            return None
+        for team in div:
+            if clinches.division[team.id]:
+                return team
+        return None
 
     # div is a list of Teams
     def get_division_champ(self, div):
@@ -54,7 +122,7 @@ class Tiebreakers:
         if len(tied) > 2:
             return self.threeplus_team_div_tiebreaker(tied)
 
-    def get_wildcards(self, standings, is_afc, div_champs):
+    def get_wildcards(self, standings, is_afc, div_champs, clinches=None):
         rem_teams = []
         if is_afc:
             for d in standings.afc.values():
@@ -63,6 +131,9 @@ class Tiebreakers:
             for d in standings.nfc.values():
                 rem_teams.extend(d)
         rem_teams = list(set(rem_teams).difference(div_champs))
+        if clinches is not None:
+            # teams out of the playoffs can't be tied for a spot
+            rem_teams = [t for t in rem_teams if not clinches.out_playoffs[t.id]]
         # Figure out tiebreakers
         rem_teams.sort(reverse=True)
         wildcards = []
@@ -124,16 +195,18 @@ class Tiebreakers:
                 raise RuntimeError()
         return wildcards
 
-    def get_playoff_seeds(self, standings):
+    def get_playoff_seeds(self, standings, clinches=None):
         # returns two lists, with 7 playoff seeds in AFC and NFC
+        # clinches (clinches.Clinches) skips divisions already won and
+        # teams already out, see get_playoff_seeds_batch
         # get division champs
         afc_champs = []
         for d in standings.afc.values():
-            champ = self.get_division_champ(d)
+            champ = self.clinched_champ(d, clinches) or self.get_division_champ(d)
             afc_champs.append(champ)
         nfc_champs = []
         for d in standings.nfc.values():
-            champ = self.get_division_champ(d)
+            champ = self.clinched_champ(d, clinches) or self.get_division_champ(d)
             nfc_champs.append(champ)
         assert len(afc_champs) == 4
         assert len(nfc_champs) == 4
@@ -159,13 +232,199 @@ class Tiebreakers:
         
         nfc_seeds = [seed1n, seed2n, seed3n, seed4n]
         # get wildcard teams
-        afc_seeds.extend(self.get_wildcards(standings, True, afc_seeds))
-        nfc_seeds.extend(self.get_wildcards(standings, False, nfc_seeds))
+        afc_seeds.extend(self.get_wildcards(standings, True, afc_seeds, clinches))
+        nfc_seeds.extend(self.get_wildcards(standings, False, nfc_seeds, clinches))
 
         assert len(afc_seeds) == 7
         assert len(nfc_seeds) == 7
         return afc_seeds, nfc_seeds
 
+    # Batch version of get_playoff_seeds over a block of simulated epochs.
+    # outcomes is epochs x games (True where schedule team1 won), played on
+    # top of the baseline standings. Returns two epochs x 7 arrays of team
+    # ids (AFC, NFC). Records, division / conference records and head-to-head
+    # are computed for every epoch at once and the tiebreakers that only need
+    # those (two-team ties, and wild card ties between teams from different
+    # divisions settled by a sweep or conference record) are applied with
+    # numpy. Epochs left with any other tie fall back to get_playoff_seeds.
+    # clinches (a clinches.Clinches for the same baseline and schedule) skips
+    # the work for decided teams: divisions already won aren't ordered and
+    # teams out of the playoffs aren't wild card candidates. Neither can be
+    # in a tie that matters, so the seeds are the same as without it
+    def get_playoff_seeds_batch(self, standings, schedule, outcomes, clinches=None):
+        epochs = outcomes.shape[0]
+        n = len(self.ids)
+        winners = np.where(outcomes, schedule.t1, schedule.t2)
+        losers = np.where(outcomes, schedule.t2, schedule.t1)
+        rows = np.arange(epochs)[:, None]
+        wins = standings.wins + np.bincount((rows * n + winners).ravel(), minlength=epochs * n).reshape(epochs, n)
+        games = standings.wins + standings.losses + standings.ties + schedule.played.sum(axis=1)
+        wlt = (wins + 0.5 * standings.ties) / np.maximum(games, 1)
+        h2h = standings.h2h + np.bincount(((rows * n + winners) * n + losers).ravel(), minlength=epochs * n * n).reshape(epochs, n, n)
+        played = standings.played + schedule.played
+        # record (ties count half) of i against j in every epoch
+        pts = h2h + 0.5 * (played - h2h - h2h.transpose(0, 2, 1))
+        records = BatchRecords(h2h, pts, (pts * self.div_mask).sum(axis=2), (pts * self.conf_mask).sum(axis=2), played > 0)
+
+        fallback = np.zeros(epochs, dtype=bool)
+        seeds = []
+        for conf_name in ["AFC", "NFC"]:
+            conf = self.conf_names.index(conf_name)
+            divs = [d for d in range(len(self.div_names)) if self.conf_ids[self.div_ids == d][0] == conf]
+            champs = np.empty((epochs, len(divs)), dtype=np.intp)
+            for k, d in enumerate(divs):
+                div_teams = np.flatnonzero(self.div_ids == d)
+                if clinches is not None and clinches.division[div_teams].any():
+                    champs[:, k] = div_teams[clinches.division[div_teams]][0]
+                    continue
+                div_teams = np.broadcast_to(div_teams, (epochs, 4))
+                order, unresolved = self.order_by_record(wlt, div_teams, records, 1)
+                champs[:, k] = order[:, 0]
+                fallback |= unresolved
+            champ_order, unresolved = self.order_by_record(wlt, champs, records, len(divs))
+            fallback |= unresolved
+            # everyone in the conference who didn't win their division
+            conf_teams = np.flatnonzero(self.conf_ids == conf)
+            if clinches is not None:
+                conf_teams = conf_teams[~clinches.out_playoffs[conf_teams]]
+            others = np.broadcast_to(conf_teams, (epochs, conf_teams.shape[0]))
+            others = others[~(others[:, :, None] == champs[:, None, :]).any(axis=2)].reshape(epochs, -1)
+            wildcards, unresolved = self.pick_wildcards(wlt, others, records, 7 - len(divs))
+            fallback |= unresolved
+            seeds.append(np.concatenate([champ_order, wildcards], axis=1))
+
+        for e in np.flatnonzero(fallback):
+            standings.add_results(schedule.t1, schedule.t2, outcomes[e], schedule.played)
+            scalar_seeds = self.get_playoff_seeds(standings, clinches)
+            for conf in range(len(seeds)):
+                seeds[conf][e] = [t.id for t in scalar_seeds[conf]]
+            standings.reset()
+        self.batch_fallbacks = int(fallback.sum())
+        return seeds[0], seeds[1]
+
+    # Orders the candidate teams (epochs x k ids) by wlt and breaks two-team
+    # ties among the first places + 1 positions with pair_scores. Returns the
+    # ordered ids and a mask of the epochs that need the scalar tiebreakers
+    def order_by_record(self, wlt, candidates, records, places):
+        vals = np.take_along_axis(wlt, candidates, axis=1)
+        order = np.argsort(-vals, axis=1, kind="stable")
+        vals = np.take_along_axis(vals, order, axis=1)
+        ids = np.take_along_axis(candidates, order, axis=1).copy()
+        k = min(places + 1, ids.shape[1])
+        tied = vals[:, 1:k] == vals[:, :k - 1]
+        # a tie between 3+ teams touching the places we need
+        unresolved = np.zeros(vals.shape[0], dtype=bool)
+        for p in range(k - 1):
+            if p + 2 < vals.shape[1]:
+                unresolved |= tied[:, p] & (vals[:, p + 2] == vals[:, p])
+        for p in range(k - 1):
+            sel = np.flatnonzero(tied[:, p] & ~unresolved)
+            if sel.shape[0] == 0:
+                continue
+            a = ids[sel, p]
+            b = ids[sel, p + 1]
+            score = self.pair_scores(sel, a, b, records)
+            unresolved[sel[score == 0]] = True
+            swap = sel[score < 0]
+            ids[swap, p], ids[swap, p + 1] = b[score < 0], a[score < 0]
+        return ids, unresolved
+
+    # Fills the wild card spots one at a time like get_wildcards, picking
+    # from the candidates (epochs x k ids) tied for the best record
+    def pick_wildcards(self, wlt, candidates, records, spots):
+        epochs, k = candidates.shape
+        rows = np.arange(epochs)
+        vals = np.take_along_axis(wlt, candidates, axis=1)
+        divs = self.div_ids[candidates]
+        remaining = np.ones((epochs, k), dtype=bool)
+        picks = np.zeros((epochs, spots), dtype=np.intp)
+        unresolved = np.zeros(epochs, dtype=bool)
+        # beat[e, i, j]: candidate i has a win over candidate j
+        beat = records.h2h[rows[:, None, None], candidates[:, :, None], candidates[:, None, :]] > 0
+        for s in range(spots):
+            best = np.where(remaining, vals, -1).max(axis=1)
+            group = remaining & (vals == best[:, None])
+            size = group.sum(axis=1)
+            first = group.argmax(axis=1)
+            pick = first.copy()
+
+            sel = np.flatnonzero(size == 2)
+            last = k - 1 - group[sel, ::-1].argmax(axis=1)
+            score = self.pair_scores(sel, candidates[sel, first[sel]], candidates[sel, last], records)
+            unresolved[sel[score == 0]] = True
+            pick[sel[score < 0]] = last[score < 0]
+
+            sel = np.flatnonzero(size >= 3)
+            if sel.shape[0] > 0:
+                g = group[sel].copy()
+                cand = candidates[sel]
+                sel_divs = divs[sel]
+                # division rivals in the tie are cut to one with the division tiebreakers
+                for d in range(len(self.div_names)):
+                    in_div = g & (sel_divs == d)
+                    count = in_div.sum(axis=1)
+                    unresolved[sel[count > 2]] = True
+                    two = np.flatnonzero(count == 2)
+                    if two.shape[0] == 0:
+                        continue
+                    first = in_div[two].argmax(axis=1)
+                    last = k - 1 - in_div[two, ::-1].argmax(axis=1)
+                    score = self.pair_scores(sel[two], cand[two, first], cand[two, last], records)
+                    g[two, np.where(score < 0, first, last)] = False
+                # head-to-head sweep of every other tied team
+                others = g[:, None, :] & ~np.eye(k, dtype=bool)
+                sweeper = g & (beat[sel] | ~others).all(axis=2)
+                swept = g & (beat[sel].transpose(0, 2, 1) | ~others).all(axis=2) & (g.sum(axis=1) >= 3)[:, None]
+                has_sweeper = sweeper.any(axis=1)
+                g &= ~(swept & ~has_sweeper[:, None])
+                # a cut with 3+ still tied restarts the 3 team tiebreakers
+                unresolved[sel[swept.any(axis=1) & ~has_sweeper & (g.sum(axis=1) > 2)]] = True
+                # then conference record among the teams still tied
+                conf = np.where(g, records.conf_rec[sel[:, None], cand], -1)
+                best_conf = np.where(g.sum(axis=1) >= 3, conf.max(axis=1), -1)
+                g &= (conf == best_conf[:, None]) | (best_conf == -1)[:, None]
+                left = g.sum(axis=1)
+                # 3+ still tied on conference record needs tiebreaker8 and beyond
+                unresolved[sel[~has_sweeper & (left > 2)]] = True
+                pick[sel] = np.where(has_sweeper, sweeper.argmax(axis=1), g.argmax(axis=1))
+                # two left go to the two-team wild card tiebreaker
+                pair = np.flatnonzero(~has_sweeper & (left == 2))
+                if pair.shape[0] > 0:
+                    first = g[pair].argmax(axis=1)
+                    last = k - 1 - g[pair, ::-1].argmax(axis=1)
+                    score = self.pair_scores(sel[pair], cand[pair, first], cand[pair, last], records)
+                    pick[sel[pair]] = np.where(score < 0, last, first)
+
+            picks[:, s] = candidates[rows, pick]
+            remaining[rows, pick] = False
+        return picks, unresolved
+
+    # Two-team tiebreakers for pairs a, b (team id arrays) in epochs e:
+    # positive where a wins, negative where b wins. Division rivals use
+    # head-to-head, division record, common games and conference record;
+    # others use head-to-head, conference record and common games (minimum
+    # of 4). Whatever is still tied goes to a coin flip
+    def pair_scores(self, e, a, b, records):
+        same_div = self.div_ids[a] == self.div_ids[b]
+        common = records.opps[a] & records.opps[b]
+        common_rec = ((records.pts[e, a] - records.pts[e, b]) * common).sum(axis=1)
+        common_rec[~same_div & (common.sum(axis=1) < 4)] = 0
+        div_diff = records.div_rec[e, a] - records.div_rec[e, b]
+        conf_diff = records.conf_rec[e, a] - records.conf_rec[e, b]
+        steps = [records.pts[e, a, b] - records.pts[e, b, a],
+                 np.where(same_div, div_diff, conf_diff),
+                 common_rec,
+                 np.where(same_div, conf_diff, 0)]
+        score = np.zeros(len(e))
+        for step in steps:
+            score = np.where(score != 0, score, step)
+        if self.stats is not None:
+            self.stats.count_pairs(same_div, steps)
+        # coin flip, drawn from self.rng like tiebreaker5
+        flips = np.flatnonzero(score == 0)
+        score[flips] = [self.rng.choice([1, -1]) for _ in flips]
+        return score
+
     # Takes in two team objects and returns the winner after divisional tiebreakers
     # 1. Head-to-head
     # 2. Divisional record
@@ -178,6 +437,9 @@ class Tiebreakers:
             return team1
         elif team2 > team1:
             return team2
+        return self.memoized("div2", [team1, team2], lambda: self.resolve_two_team_div(team1, team2))
+
+    def resolve_two_team_div(self, team1, team2):
         tb1 = self.tiebreaker1(team1, team2)
         if len(tb1) == 1:
             return tb1[0]
@@ -203,6 +465,9 @@ class Tiebreakers:
             return team1
         elif team2 > team1:
             return team2
+        return self.memoized("wc2", [team1, team2], lambda: self.resolve_two_team_wc(team1, team2))
+
+    def resolve_two_team_wc(self, team1, team2):
         tb1 = self.tiebreaker1(team1, team2)
         if len(tb1) == 1:
             return tb1[0]
@@ -220,15 +485,20 @@ class Tiebreakers:
         # check for if one team has better WLT than others, just like two-way tiebreakers    
         teams.sort(reverse=True)
         # find out how many teams are tied (2-4)
-        for i in range(1, len(teams)):
+        i = 1
+        while i < len(teams):
             if teams[i] != teams[0]:
                 break
+            i += 1
         left = teams[:i]
         if len(left) == 1:
             return left[0]
         if len(left) == 2:
             # restart at 2 team tiebreaker
             return self.two_team_div_tiebreaker(left[0], left[1])
+        return self.memoized("div3", left, lambda: self.resolve_threeplus_team_div(left))
+
+    def resolve_threeplus_team_div(self, left):
         tiebreakers = [self.tiebreaker6, self.tiebreaker7, self.tiebreaker8, self.tiebreaker9, self.tiebreaker10]
         start_len = len(left)
         for i in range(len(tiebreakers)):
@@ -250,15 +520,20 @@ class Tiebreakers:
         # check for if one team has better WLT than others, just like two-way tiebreakers    
         teams.sort(reverse=True)
         # find out how many teams are tied (2-4)
-        for i in range(1, len(teams)):
+        i = 1
+        while i < len(teams):
             if teams[i] != teams[0]:
                 break
+            i += 1
         left = teams[:i]
         if len(left) == 1:
             return left[0]
         if len(left) == 2:
             # restart at 2 team tiebreaker
             return self.two_team_wc_tiebreaker(left[0], left[1])
+        return self.memoized("wc3", left, lambda: self.resolve_threeplus_team_wc(left))
+
+    def resolve_threeplus_team_wc(self, left):
         tiebreakers = [self.tiebreaker11, self.tiebreaker9, self.tiebreaker8, self.tiebreaker10]
         start_len = len(left)
         for i in range(len(tiebreakers)):
@@ -281,15 +556,9 @@ class Tiebreakers:
     # Head-to-head record
     def tiebreaker1(self, team1, team2):
         # Head-to-head team record
-        t1wins = 0
-        t2wins = 0
-        for game in team1.games:
-            # abbr of opposing team
-            opp = self.get_opp(game, team1)
-            if opp == team2.abb:
-                # found game against team2
-                t1wins += self.wins_from_game(game, team1)
-                t2wins += self.wins_from_game(game, team2)
+        standings = team1.standings
+        t1wins = standings.record_vs(team1.id, [team2.id])
+        t2wins = standings.record_vs(team2.id, [team1.id])
         if t1wins > t2wins:
             return [team1]
         elif t2wins > t1wins:
@@ -298,18 +567,8 @@ class Tiebreakers:
 
     # In-division record
     def tiebreaker2(self, team1, team2):
-        t1wins = 0
-        for game in team1.games:
-            opp = self.get_opp(game, team1)
-            if self.team_info[opp]["DIV"] == team1.divName:
-                # teams in same division, count result
-                t1wins += self.wins_from_game(game, team1)
-        t2wins = 0
-        for game in team2.games:
-            opp = self.get_opp(game, team2)
-            if self.team_info[opp]["DIV"] == team2.divName:
-                # teams in same division, count result
-                t2wins += self.wins_from_game(game, team2)
+        t1wins = self.div_record(team1)
+        t2wins = self.div_record(team2)
         if t1wins > t2wins:
             return [team1]
         elif t2wins > t1wins:
@@ -318,25 +577,13 @@ class Tiebreakers:
 
     # Record in common opponents
     def tiebreaker3(self, team1, team2, minimum):
-        # use sets to find common opponents
-        # loop through to get total wins each against common opponents
-        t1_opps = set()
-        for game in team1.games:
-            t1_opps.add(self.get_opp(game, team1))
-        t2_opps = set()
-        for game in team2.games:
-            t2_opps.add(self.get_opp(game, team2))
-        common_opps = t1_opps.intersection(t2_opps)
-        if minimum and len(common_opps) < 4:
+        # mask of opponents both teams have played
+        standings = team1.standings
+        common_opps = standings.opponents(team1.id) & standings.opponents(team2.id)
+        if minimum and common_opps.sum() < 4:
             return [team1, team2]
-        t1wins = 0
-        for game in team1.games:
-            if self.get_opp(game, team1) in common_opps:
-                t1wins += self.wins_from_game(game, team1)
-        t2wins = 0
-        for game in team2.games:
-            if self.get_opp(game, team2) in common_opps:
-                t2wins += self.wins_from_game(game, team2)
+        t1wins = standings.record_vs(team1.id, common_opps)
+        t2wins = standings.record_vs(team2.id, common_opps)
         if t1wins > t2wins:
             return [team1]
         elif t2wins > t1wins:
@@ -345,18 +592,8 @@ class Tiebreakers:
 
     # Record in conference
     def tiebreaker4(self, team1, team2):
-        t1wins = 0
-        for game in team1.games:
-            opp = self.get_opp(game, team1)
-            if self.team_info[opp]["DIV"].startswith(team1.conf):
-                # opponent in same conference
-                t1wins += self.wins_from_game(game, team1)
-        t2wins = 0
-        for game in team2.games:
-            opp = self.get_opp(game, team2)
-            if self.team_info[opp]["DIV"].startswith(team2.conf):
-                # opponent in same conference
-                t2wins += self.wins_from_game(game, team2)
+        t1wins = self.conf_record(team1)
+        t2wins = self.conf_record(team2)
         if t1wins > t2wins:
             return [team1]
         elif t2wins > t1wins:
@@ -365,88 +602,41 @@ class Tiebreakers:
 
     # Coin flip
     def tiebreaker5(self, team1, team2):
-        return [random.choice([team1, team2])]
+        self.coin_flipped = True
+        return [self.rng.choice([team1, team2])]
 
     # 3+ team head-to-head
     # returns array of the teams remaining after tiebreaker
     def tiebreaker6(self, teams):
         # For each team, tally record against games against other teams
-        abbs = set()
-        for t in teams:
-            abbs.add(t.abb)
-        records = []
-        for t in teams:
-            tot_wins = 0
-            for g in t.games:
-                opp = self.get_opp(g, t)
-                if opp in abbs:
-                    tot_wins += self.wins_from_game(g, t)
-            records.append((tot_wins, t))
-        records = sorted(records, key=lambda x: x[0], reverse=True)
-        # figure out how many teams remained tied
-        i = 1
-        while i < len(records) and records[i][0] == records[0][0]:
-            i += 1
-        tied = records[:i]
-        return [team[1] for team in tied]
+        standings = teams[0].standings
+        ids = [t.id for t in teams]
+        records = [(standings.record_vs(t.id, ids), t) for t in teams]
+        return self.top_records(records)
         
     # 3+ team in-division
     def tiebreaker7(self, teams):
-        records = []
-        for t in teams:
-            tot_wins = 0
-            for g in t.games:
-                opp = self.get_opp(g, t)
-                if self.team_info[opp]["DIV"] == t.divName: # game is in-division
-                    tot_wins += self.wins_from_game(g, t)
-            records.append((tot_wins, t))
-        records = sorted(records, key=lambda x: x[0], reverse=True)
-        # figure out how many teams remained tied
-        i = 1
-        while i < len(records) and records[i][0] == records[0][0]:
-            i += 1
-        tied = records[:i]
-        return [team[1] for team in tied]
+        records = [(self.div_record(t), t) for t in teams]
+        return self.top_records(records)
 
     # 3+ team common-games
     def tiebreaker8(self, teams, minimum):
-        opps = [] # list of sets, each containing a team's opponents
-        for t in teams:
-            t_opps = set()
-            for game in t.games:
-                t_opps.add(self.get_opp(game, t))
-            opps.append(t_opps)
-        common_opps = opps[0]
-        for i in range(1, len(opps)):
-            common_opps = common_opps.intersection(opps[i])
-        if minimum and len(common_opps) < 4:
+        standings = teams[0].standings
+        common_opps = standings.opponents(teams[0].id)
+        for i in range(1, len(teams)):
+            common_opps = common_opps & standings.opponents(teams[i].id)
+        if minimum and common_opps.sum() < 4:
             return teams
-        
-        records = []
-        for t in teams:
-            tot_wins = 0
-            for g in t.games:
-                if self.get_opp(g, t) in common_opps:
-                    tot_wins += self.wins_from_game(g, t)
-            records.append((tot_wins, t))
-        records = sorted(records, key=lambda x: x[0], reverse=True)
-        # figure out how many teams remained tied
-        i = 1
-        while i < len(records) and records[i][0] == records[0][0]:
-            i += 1
-        tied = records[:i]
-        return [team[1] for team in tied]
+        records = [(standings.record_vs(t.id, common_opps), t) for t in teams]
+        return self.top_records(records)
 
     # 3+ team in-conference
     def tiebreaker9(self, teams):
-        records = []
-        for t in teams:
-            tot_wins = 0
-            for g in t.games:
-                opp = self.get_opp(g, t)
-                if self.team_info[opp]["DIV"][:3] == t.conf: # game is in-conference
-                    tot_wins += self.wins_from_game(g, t)
-            records.append((tot_wins, t))
+        records = [(self.conf_record(t), t) for t in teams]
+        return self.top_records(records)
+
+    # records is a list of (wins, Team), returns the teams tied for the best
+    def top_records(self, records):
         records = sorted(records, key=lambda x: x[0], reverse=True)
         # figure out how many teams remained tied
         i = 1
@@ -457,30 +647,21 @@ class Tiebreakers:
 
     # 3+ team coin toss
     def tiebreaker10(self, teams):
-        return [random.choice(teams)]
+        self.coin_flipped = True
+        return [self.rng.choice(teams)]
 
     # 3+ team head-to-head sweep
     def tiebreaker11(self, teams):
         # If one team defeated all others, they win tiebreaker
         # If one team lost to all others, they are eliminated from tiebreaker
-        team_set = set([t.abb for t in teams])
+        h2h = teams[0].standings.h2h
         sweep_loser = -1 # index of team that lost to all teams, if any
         for i, t in list(enumerate(teams)):
-            wins = set()
-            losses = set()
-            for g in t.games:
-                opp = self.get_opp(g, t)
-                w = self.wins_from_game(g, t)
-                if w == 1:
-                    wins.add(opp)
-                elif w == 0:
-                    losses.add(opp)
-            team_set_others = team_set.copy()
-            team_set_others.remove(t.abb)
-            if wins.intersection(team_set_others) == team_set_others:
+            others = [o.id for o in teams if o.id != t.id]
+            if (h2h[t.id, others] > 0).all():
                 # this team beat all other teams
                 return [t]
-            if losses.intersection(team_set_others) == team_set_others:
+            if (h2h[others, t.id] > 0).all():
                 # this team lost to all other teams
                 sweep_loser = i
         if sweep_loser != -1: # if one team lost to all others, remove it